@@ -22,18 +22,25 @@ from . import (
 from .announcement import *
 from .application import *
 from .attachment import *
+from .backoff import *
 from .blog import *
+from .bulk import *
+from .cache import *
 from .types import *
 from .channel import *
 from .client import *
+from .dispatcher import *
 from .color import *
 from .embed import *
+from .export import *
 from .enums import *
 from .flags import *
 from .gateway import *
 from .http import *
+from .iterators import *
 from .member import *
 from .message import *
+from .outbox import *
 from .permissions import *
 from .reaction import *
 from .role import *
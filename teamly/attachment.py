@@ -21,3 +21,173 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 '''
+
+from __future__ import annotations
+
+import asyncio
+import aiohttp
+import io
+import mimetypes
+import os
+import time
+
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Optional, Union
+
+from .types.attachment import Attachment as AttachmentPayload
+
+__all__ = ['Attachment']
+
+ProgressCallback = Callable[['Attachment'], Any]
+
+
+class Attachment:
+    """A file to upload along with a message.
+
+    The content is streamed in chunks while uploading, files are never
+    read into memory as a whole.
+
+    Parameters
+    ----------
+    fp: Union[str, os.PathLike, io.BufferedIOBase, AsyncIterable[bytes]]
+        A path, a binary file object or an async iterable of bytes.
+    filename: Optional[str]
+        The name shown in the client, defaults to the name of the file.
+    content_type: Optional[str]
+        Guessed from the filename when omitted.
+    chunk_size: int
+        Bytes read per chunk.
+
+    Attributes
+    ----------
+    url: Optional[str]
+        Set once the upload finished.
+    size: Optional[int]
+        The size in bytes, ``None`` for async iterables until uploaded.
+    uploaded: int
+        Bytes sent by the current upload, for progress reporting.
+    """
+
+    __slots__ = (
+        'fp',
+        'filename',
+        'content_type',
+        'chunk_size',
+        'url',
+        'size',
+        'uploaded',
+        '_start',
+        '_started',
+        '_elapsed',
+        '_consumed',
+        '_progress'
+    )
+
+    def __init__(
+        self,
+        fp: Union[str, os.PathLike, io.BufferedIOBase, AsyncIterable[bytes]],
+        *,
+        filename: Optional[str] = None,
+        content_type: Optional[str] = None,
+        chunk_size: int = 64 * 1024
+    ) -> None:
+        self.fp = fp
+        self.chunk_size: int = chunk_size
+        self.url: Optional[str] = None
+        self.size: Optional[int] = None
+        self.uploaded: int = 0
+        self._start: int = 0
+        self._started: float = 0.0
+        self._elapsed: float = 0.0
+        self._consumed: bool = False
+        self._progress: Optional[ProgressCallback] = None
+
+        if isinstance(fp, (str, os.PathLike)):
+            self.size = os.path.getsize(fp)
+            name = os.fspath(fp)
+        elif hasattr(fp, 'read'):
+            name = getattr(fp, 'name', None)
+            if fp.seekable(): #type: ignore
+                self._start = fp.tell() #type: ignore
+                self.size = fp.seek(0, io.SEEK_END) - self._start #type: ignore
+                fp.seek(self._start) #type: ignore
+        elif hasattr(fp, '__aiter__'):
+            name = None
+        else:
+            raise TypeError(f"expected a path, a binary file object or an async iterable, not {type(fp).__name__}")
+
+        if filename is None:
+            filename = os.path.basename(name) if isinstance(name, str) else 'file'
+        self.filename: str = filename
+        self.content_type: str = content_type or mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    @property
+    def replayable(self) -> bool:
+        """Whether the content can be sent again, e.g. when the upload is retried."""
+        if isinstance(self.fp, (str, os.PathLike)):
+            return True
+        if hasattr(self.fp, 'read'):
+            return self.fp.seekable() #type: ignore
+        return not self._consumed
+
+    @property
+    def throughput(self) -> float:
+        """Bytes per second of the current or last upload."""
+        elapsed = self._elapsed or (time.perf_counter() - self._started if self._started else 0.0)
+        return self.uploaded / elapsed if elapsed else 0.0
+
+    async def _chunks(self) -> AsyncIterator[bytes]:
+        self.uploaded = 0
+        self._started = time.perf_counter()
+        self._elapsed = 0.0
+
+        if isinstance(self.fp, (str, os.PathLike)):
+            fp = await asyncio.to_thread(open, self.fp, 'rb')
+            try:
+                async for chunk in self._read(fp):
+                    yield chunk
+            finally:
+                await asyncio.to_thread(fp.close)
+        elif hasattr(self.fp, 'read'):
+            if self.fp.seekable(): #type: ignore
+                self.fp.seek(self._start) #type: ignore
+            async for chunk in self._read(self.fp):
+                yield chunk
+        else:
+            if self._consumed:
+                raise RuntimeError(f"{self.filename!r} was already uploaded and can't be read again")
+            self._consumed = True
+            async for chunk in self.fp: #type: ignore
+                yield self._advance(chunk)
+            self.size = self.uploaded
+
+        self._elapsed = time.perf_counter() - self._started
+
+    async def _read(self, fp: Any) -> AsyncIterator[bytes]:
+        # reads happen in a thread so large files don't block the event loop
+        while True:
+            chunk = await asyncio.to_thread(fp.read, self.chunk_size)
+            if not chunk:
+                return
+            yield self._advance(chunk)
+
+    def _advance(self, chunk: bytes) -> bytes:
+        self.uploaded += len(chunk)
+        if self._progress is not None:
+            self._progress(self)
+        return chunk
+
+    @property
+    def _formdata(self) -> aiohttp.FormData:
+        form = aiohttp.FormData()
+        form.add_field('file', self._chunks(), filename=self.filename, content_type=self.content_type)
+        return form
+
+    def to_dict(self) -> AttachmentPayload:
+        return {
+            "url": self.url, #type: ignore
+            "name": self.filename,
+            "fileSiteBytes": self.size if self.size is not None else self.uploaded
+        }
+
+    def __repr__(self) -> str:
+        return f"<Attachment filename={self.filename} size={self.size} url={self.url}>"
@@ -0,0 +1,74 @@
+'''
+MIT License
+
+Copyright (c) 2025 Fatih Kuloglu
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+'''
+
+from __future__ import annotations
+
+import random
+import time
+
+__all__ = (
+    'ExponentialBackoff',
+)
+
+
+class ExponentialBackoff:
+    """Jittered exponential backoff used between reconnect attempts.
+
+    Every call to :meth:`delay` doubles the upper bound of the next wait,
+    up to ``2 ** max_exponent * base`` seconds. The returned value is picked
+    at random between zero and that bound ("full jitter") so many clients
+    that lost their connection at the same time don't reconnect in lockstep.
+
+    If no delay was requested for longer than the largest possible wait,
+    the backoff starts over from the beginning.
+
+    Parameters
+    ----------
+    base: float
+        The upper bound of the first wait in seconds.
+    max_exponent: int
+        The highest exponent the bound is allowed to reach.
+    """
+
+    def __init__(self, base: float = 1.0, *, max_exponent: int = 6) -> None:
+        self._base: float = base
+        self._max: int = max_exponent
+        self._exp: int = 0
+        self._reset_time: float = base * 2 ** (max_exponent + 1)
+        self._last_invocation: float = time.monotonic()
+        self._randfunc = random.Random().uniform
+
+    def delay(self) -> float:
+        invocation = time.monotonic()
+        interval = invocation - self._last_invocation
+        self._last_invocation = invocation
+
+        if interval > self._reset_time:
+            self._exp = 0
+
+        self._exp = min(self._exp + 1, self._max)
+        return self._randfunc(0, self._base * 2 ** self._exp)
+
+    def reset(self) -> None:
+        self._exp = 0
@@ -0,0 +1,100 @@
+'''
+MIT License
+
+Copyright (c) 2025 Fatih Kuloglu
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+'''
+
+from __future__ import annotations
+
+import asyncio
+
+from typing import Any, Awaitable, Callable, Dict, Iterable
+from loguru import logger
+
+from .http import _raise_for_status
+
+__all__ = (
+    'BulkResult',
+    'run_bulk',
+)
+
+
+class BulkResult:
+    """The outcome of a bulk operation, per item.
+
+    Attributes
+    ----------
+    succeeded: Dict[str, Any]
+        Item ids mapped to the response of their request.
+    failed: Dict[str, BaseException]
+        Item ids mapped to the error of their request, usually a
+        :class:`HTTPException`.
+    """
+
+    __slots__ = ('succeeded', 'failed')
+
+    def __init__(self) -> None:
+        self.succeeded: Dict[str, Any] = {}
+        self.failed: Dict[str, BaseException] = {}
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+    def __len__(self) -> int:
+        return len(self.succeeded) + len(self.failed)
+
+    def __repr__(self) -> str:
+        return f"<BulkResult succeeded={len(self.succeeded)} failed={len(self.failed)}>"
+
+
+async def run_bulk(
+    ids: Iterable[str],
+    func: Callable[[str], Awaitable[Any]],
+    *,
+    concurrency: int = 5
+) -> BulkResult:
+    """Calls ``func`` for every id, at most ``concurrency`` at a time.
+
+    Errors are collected in the result instead of being raised, failed
+    requests raise :class:`HTTPException` inside ``func``. Requests of one
+    operation share a rate limit bucket, so the default matches its
+    initial budget.
+    """
+
+    result = BulkResult()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(id: str) -> None:
+        async with semaphore:
+            _raise_for_status.set(True)
+            try:
+                result.succeeded[id] = await func(id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                result.failed[id] = e
+
+    # gather runs every call in its own task, the flag stays local to it
+    await asyncio.gather(*(run(id) for id in dict.fromkeys(ids)))
+    if result.failed:
+        logger.warning("Bulk operation finished with {} of {} failed", len(result.failed), len(result))
+    return result
@@ -21,3 +21,460 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 '''
+
+from __future__ import annotations
+
+import sqlite3
+import time
+
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, Generic, Iterator, List, Optional, Tuple, TypeVar, Union
+from loguru import logger
+
+from .utils import DEFAULT_CODEC, JSONCodec
+
+if TYPE_CHECKING:
+    from .channel import TextChannel, TodoChannel, WatchStreamChannel, VoiceChannel, AnnouncementChannel
+    from .member import Member
+    from .message import Message
+    from .role import Role
+    from .team import Team
+    from .user import User
+    from .http import Route
+
+    Channel = Union[TextChannel, TodoChannel, WatchStreamChannel, VoiceChannel, AnnouncementChannel]
+
+__all__ = (
+    'LRUCache',
+    'EntityCache',
+    'CacheSnapshot',
+    'ResponseCache',
+)
+
+K = TypeVar('K')
+V = TypeVar('V')
+
+
+class LRUCache(Generic[K, V]):
+    """A mapping that keeps at most ``max_size`` entries.
+
+    The least recently used entry is evicted when a new one doesn't fit.
+    With a ``ttl`` entries also expire that many seconds after they were
+    stored. When a ``loader`` is set it is called on a miss and whatever
+    it returns is stored, this is how snapshots are loaded lazily.
+
+    Parameters
+    ----------
+    max_size: int
+        The number of entries to keep. ``0`` disables the cache.
+    ttl: Optional[float]
+        Seconds an entry stays valid, ``None`` keeps it until evicted.
+    """
+
+    __slots__ = ('max_size', 'ttl', 'hits', 'misses', 'loader', '_data')
+
+    def __init__(self, max_size: int, *, ttl: Optional[float] = None) -> None:
+        self.max_size: int = max_size
+        self.ttl: Optional[float] = ttl
+        self.hits: int = 0
+        self.misses: int = 0
+        self.loader: Optional[Callable[[K], Optional[V]]] = None
+        self._data: OrderedDict[K, Tuple[V, float]] = OrderedDict()
+
+    def get(self, key: K, default: Any = None) -> Optional[V]:
+        try:
+            value, expires = self._data[key]
+        except KeyError:
+            return self._miss(key, default)
+
+        if expires and expires < time.monotonic():
+            del self._data[key]
+            return self._miss(key, default)
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def _miss(self, key: K, default: Any) -> Optional[V]:
+        self.misses += 1
+        if self.loader is None:
+            return default
+
+        value = self.loader(key)
+        if value is None:
+            return default
+
+        self.set(key, value)
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        if self.max_size <= 0:
+            return
+
+        expires = time.monotonic() + self.ttl if self.ttl else 0.0
+        self._data[key] = (value, expires)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def pop(self, key: K, default: Any = None) -> Optional[V]:
+        try:
+            return self._data.pop(key)[0]
+        except KeyError:
+            return default
+
+    def items(self) -> List[Tuple[K, V]]:
+        return [(key, value) for key, (value, _) in self._data.items()]
+
+    def values(self) -> List[V]:
+        return [value for value, _ in self._data.values()]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __iter__(self) -> Iterator[K]:
+        return iter(list(self._data))
+
+    def __repr__(self) -> str:
+        return f"<LRUCache size={len(self._data)} maxSize={self.max_size} hits={self.hits} misses={self.misses}>"
+
+
+class EntityCache:
+    """In-memory store for the entities the client has seen.
+
+    Every kind of entity lives in its own :class:`LRUCache`, so memory is
+    bounded by ``max_size`` entries per kind. Gateway events keep the
+    entries fresh, see :class:`ConnectionState`.
+
+    Parameters
+    ----------
+    max_size: int
+        Entries to keep per kind of entity.
+    max_messages: int
+        Messages to keep. ``0`` disables the message cache.
+    ttl: Optional[float]
+        Seconds an entry stays valid, ``None`` keeps it until evicted.
+    """
+
+    def __init__(self, max_size: int = 1000, *, max_messages: int = 0, ttl: Optional[float] = None) -> None:
+        self.teams: LRUCache[str, Team] = LRUCache(max_size, ttl=ttl)
+        self.channels: LRUCache[str, Channel] = LRUCache(max_size, ttl=ttl)
+        self.roles: LRUCache[str, Role] = LRUCache(max_size, ttl=ttl)
+        self.members: LRUCache[Tuple[str, str], Member] = LRUCache(max_size, ttl=ttl)
+        self.users: LRUCache[str, User] = LRUCache(max_size, ttl=ttl)
+        self.messages: LRUCache[str, Message] = LRUCache(max_messages, ttl=ttl)
+
+        # teamId -> ids, only present when the full list was fetched
+        self._team_channels: LRUCache[str, Tuple[str, ...]] = LRUCache(max_size, ttl=ttl)
+        self._team_roles: LRUCache[str, Tuple[str, ...]] = LRUCache(max_size, ttl=ttl)
+
+    @property
+    def enabled(self) -> bool:
+        return self.teams.max_size > 0
+
+    # Channels
+
+    def store_channel(self, channel: Channel) -> None:
+        self.channels.set(channel.id, channel)
+
+    def remove_channel(self, channel_id: str, team_id: Optional[str] = None) -> Optional[Channel]:
+        channel = self.channels.pop(channel_id)
+        if team_id is not None:
+            self._team_channels.pop(team_id)
+        return channel
+
+    def store_team_channels(self, team_id: str, channels: List[Channel]) -> None:
+        for channel in channels:
+            self.channels.set(channel.id, channel)
+        self._team_channels.set(team_id, tuple(c.id for c in channels))
+
+    def get_team_channels(self, team_id: str) -> Optional[List[Channel]]:
+        return self._resolve(self._team_channels.get(team_id), self.channels)
+
+    def invalidate_team_channels(self, team_id: str) -> None:
+        self._team_channels.pop(team_id)
+
+    # Roles
+
+    def store_role(self, role: Role) -> None:
+        self.roles.set(role.id, role)
+
+    def remove_role(self, role_id: str, team_id: Optional[str] = None) -> Optional[Role]:
+        role = self.roles.pop(role_id)
+        if team_id is not None:
+            self._team_roles.pop(team_id)
+        return role
+
+    def store_team_roles(self, team_id: str, roles: List[Role]) -> None:
+        for role in roles:
+            self.roles.set(role.id, role)
+        self._team_roles.set(team_id, tuple(r.id for r in roles))
+
+    def get_team_roles(self, team_id: str) -> Optional[List[Role]]:
+        return self._resolve(self._team_roles.get(team_id), self.roles)
+
+    def invalidate_team_roles(self, team_id: str) -> None:
+        self._team_roles.pop(team_id)
+
+    def _resolve(self, ids: Optional[Tuple[str, ...]], cache: LRUCache[str, Any]) -> Optional[List[Any]]:
+        if ids is None:
+            return None
+
+        items = []
+        for id in ids:
+            item = cache.get(id)
+            if item is None:
+                # part of the list was evicted, treat it as a miss
+                return None
+            items.append(item)
+        return items
+
+    def clear(self) -> None:
+        """Forgets every entity, including the rows of a snapshot not read yet."""
+        for cache in (
+            self.teams, self.channels, self.roles, self.members,
+            self.users, self.messages, self._team_channels, self._team_roles
+        ):
+            cache.clear()
+            cache.loader = None
+
+    def stats(self) -> Dict[str, LRUCache[Any, Any]]:
+        return {
+            "teams": self.teams,
+            "channels": self.channels,
+            "roles": self.roles,
+            "members": self.members,
+            "users": self.users,
+            "messages": self.messages,
+        }
+
+    def __repr__(self) -> str:
+        return (
+            f"<EntityCache teams={len(self.teams)} channels={len(self.channels)} roles={len(self.roles)} "
+            f"members={len(self.members)} users={len(self.users)} messages={len(self.messages)}>"
+        )
+
+
+class ResponseCache:
+    """Caches the raw bodies of successful GET responses.
+
+    Bodies are kept as bytes and decoded again on every hit, so a caller
+    changing its response never changes what the next caller gets.
+
+    Only routes with a TTL are cached, ``ttls`` maps a route template such
+    as ``"/teams/{teamId}/roles"`` to the seconds its responses stay valid.
+    Entries are evicted least recently used first once their combined body
+    size goes over ``max_bytes``.
+
+    Entries are invalidated by successful writes to the same route, a route
+    below it or a route it is nested in, and by the gateway events listed in
+    ``state.RESPONSE_CACHE_EVENTS``.
+
+    Parameters
+    ----------
+    ttls: Optional[Dict[str, float]]
+        Per template TTLs, defaults to :attr:`DEFAULT_TTLS`.
+    max_bytes: int
+        The memory budget in bytes of response body.
+    """
+
+    DEFAULT_TTLS: Dict[str, float] = {
+        "/teams/{teamId}/details": 60.0,
+        "/teams/{teamId}/roles": 300.0,
+        "/teams/{teamId}/reactions": 300.0,
+        "/teams/{teamId}/blogs": 120.0,
+        "/teams/{teamId}/applications": 60.0,
+        "/channels/{channelId}/announcements": 120.0,
+    }
+
+    __slots__ = ('ttls', 'max_bytes', 'size', 'hits', 'misses', '_data')
+
+    def __init__(self, ttls: Optional[Dict[str, float]] = None, *, max_bytes: int = 8 * 1024 * 1024) -> None:
+        self.ttls: Dict[str, float] = dict(self.DEFAULT_TTLS if ttls is None else ttls)
+        self.max_bytes: int = max_bytes
+        self.size: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        # key -> (body, expires, size, template, teamId, channelId)
+        self._data: OrderedDict[Tuple[str, Any], Tuple[bytes, float, int, str, Optional[str], Optional[str]]] = OrderedDict()
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def cacheable(self, route: Route) -> bool:
+        return route.method == "GET" and route.template in self.ttls
+
+    def get(self, route: Route, params: Any = None, default: Any = None) -> Any:
+        key = (route.url, params)
+        try:
+            body, expires, *_ = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+
+        if expires < time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def set(self, route: Route, params: Any, body: bytes) -> None:
+        ttl = self.ttls.get(route.template)
+        size = len(body)
+        if ttl is None or size > self.max_bytes:
+            return
+
+        key = (route.url, params)
+        if key in self._data:
+            self._remove(key)
+
+        self._data[key] = (body, time.monotonic() + ttl, size, route.template, route.teamId, route.channelId)
+        self.size += size
+
+        while self.size > self.max_bytes:
+            self._remove(next(iter(self._data)))
+
+    def _remove(self, key: Tuple[str, Any]) -> None:
+        self.size -= self._data.pop(key)[2]
+
+    def invalidate(self, template: str, *, teamId: Optional[str] = None, channelId: Optional[str] = None) -> int:
+        """Drops the entries of ``template``, limited to a team or channel when given.
+
+        Returns the number of entries removed.
+        """
+
+        keys = [
+            key for key, (_, _, _, tmpl, team, channel) in self._data.items()
+            if tmpl == template
+            and (teamId is None or team == teamId)
+            and (channelId is None or channel == channelId)
+        ]
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def invalidate_route(self, route: Route) -> int:
+        """Drops the entries a write to ``route`` may have made stale."""
+
+        # A write touches everything under its resource and the resources it
+        # is nested in, e.g. ``POST /teams/{teamId}`` stales
+        # ``/teams/{teamId}/details`` and ``PATCH /teams/{teamId}/roles/{roleId}``
+        # stales ``/teams/{teamId}/roles``.
+        written = route.template.rstrip('/') + '/'
+        removed = 0
+        for template in self.ttls:
+            cached = template.rstrip('/') + '/'
+            if written.startswith(cached) or cached.startswith(written):
+                removed += self.invalidate(template, teamId=route.teamId, channelId=route.channelId)
+        return removed
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.size = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __repr__(self) -> str:
+        return (
+            f"<ResponseCache entries={len(self._data)} size={self.size} "
+            f"hits={self.hits} misses={self.misses} hitRatio={self.hit_ratio:.2f}>"
+        )
+
+
+class CacheSnapshot:
+    """Saves an :class:`EntityCache` to a sqlite file and reads it back.
+
+    Entities are stored as the JSON of their ``to_dict()``. Reading a
+    snapshot only loads those raw rows, models are built the first time
+    an entry is looked up, see :meth:`ConnectionState.load_snapshot`.
+    Messages, members and users are not saved. After a restart only teams,
+    channels and roles are reconciled with the server, stale member roles
+    would otherwise feed the permission resolver.
+
+    Parameters
+    ----------
+    path: str
+        The sqlite file to use. It is created when it doesn't exist.
+    """
+
+    VERSION = 2
+
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path)
+        db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        db.execute("CREATE TABLE IF NOT EXISTS entities (kind TEXT, key TEXT, data BLOB, PRIMARY KEY (kind, key))")
+        return db
+
+    @staticmethod
+    def dump(cache: EntityCache, codec: JSONCodec = DEFAULT_CODEC) -> List[Tuple[str, str, bytes]]:
+        """Serializes the cache into ``(kind, key, data)`` rows.
+
+        This has to run on the event loop, :meth:`save` can then write the
+        rows from another thread. Use the same ``codec`` that loads them.
+        """
+
+        dumps = codec.dumps
+        rows: List[Tuple[str, str, bytes]] = []
+        for kind in ('teams', 'channels', 'roles'):
+            for key, entity in getattr(cache, kind).items():
+                rows.append((kind, key, dumps(entity.to_dict())))
+
+        for kind, lists in (('team_channels', cache._team_channels), ('team_roles', cache._team_roles)):
+            for team_id, ids in lists.items():
+                rows.append((kind, team_id, dumps(list(ids))))
+
+        return rows
+
+    def save(self, rows: List[Tuple[str, str, bytes]]) -> None:
+        db = self._connect()
+        try:
+            with db:
+                db.execute("DELETE FROM entities")
+                db.executemany("INSERT INTO entities VALUES (?, ?, ?)", rows)
+                db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(self.VERSION),))
+                db.execute("INSERT OR REPLACE INTO meta VALUES ('saved_at', ?)", (str(time.time()),))
+        finally:
+            db.close()
+
+    def load(self, max_age: Optional[float] = None) -> Dict[str, Dict[str, bytes]]:
+        """Reads the raw rows, grouped by kind then key.
+
+        Returns an empty mapping when the file was written by another
+        snapshot version or more than ``max_age`` seconds ago.
+        """
+
+        db = self._connect()
+        try:
+            version = db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            if version is None or int(version[0]) != self.VERSION:
+                return {}
+
+            if max_age is not None:
+                saved_at = db.execute("SELECT value FROM meta WHERE key = 'saved_at'").fetchone()
+                age = time.time() - float(saved_at[0]) if saved_at else float('inf')
+                if age > max_age:
+                    logger.info("Ignoring cache snapshot {}, it is {:.0f} seconds old", self.path, age)
+                    return {}
+
+            rows: Dict[str, Dict[str, bytes]] = {}
+            for kind, key, data in db.execute("SELECT kind, key, data FROM entities"):
+                rows.setdefault(kind, {})[key] = data
+            return rows
+        finally:
+            db.close()
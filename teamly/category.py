@@ -36,6 +36,9 @@ class Category:
 
     def __init__(self, state: ConnectionState, data: CategoryPayload) -> None:
         self._state: ConnectionState = state
+        self._update(data)
+
+    def _update(self, data: CategoryPayload) -> None:
         self.id: str = data['id']
         self.team_id: str = data['teamId']
         self.name: str = data['name']
@@ -23,8 +23,11 @@ SOFTWARE.
 '''
 
 from __future__ import annotations
-from typing import TYPE_CHECKING, Dict, Optional, List
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, List, Union
 
+from .bulk import BulkResult, run_bulk
+from .iterators import HistoryIterator
 from .todo import TodoItem
 from .enums import ChannelType
 from .types.channel import (
@@ -36,6 +39,7 @@ from .types.channel import (
 )
 
 if TYPE_CHECKING:
+    from .message import Message
     from .state import ConnectionState
 
 
@@ -63,6 +67,9 @@ class TextChannel:
 
     def __init__(self, state: ConnectionState, data: TextChannelPayload) -> None:
         self._state: ConnectionState = state
+        self._update(data)
+
+    def _update(self, data: TextChannelPayload) -> None:
         self.id: str = data['id']
         self.type: str = data['type']
         self.team_id: str = data['teamId']
@@ -115,6 +122,33 @@ class TextChannel:
             channelId=self.id
         )
 
+    async def bulk_delete(self, messageIds: Iterable[str], *, concurrency: int = 5) -> BulkResult:
+        """Deletes the messages, returns a :class:`BulkResult` instead of raising."""
+        http = self._state.http
+        return await run_bulk(
+            messageIds,
+            lambda messageId: http.delete_message(channelId=self.id, messageId=messageId),
+            concurrency=concurrency
+        )
+
+    def history(
+        self,
+        *,
+        limit: Optional[int] = 100,
+        before: Optional[Union[Message, datetime]] = None,
+        after: Optional[Union[Message, datetime]] = None,
+        page_size: int = 50,
+        offset: int = 0,
+        raw: bool = False
+    ) -> HistoryIterator:
+        """Returns an async iterator over the channel messages, newest first.
+
+        Example:
+            async for message in channel.history(limit=None):
+                ...
+        """
+        return HistoryIterator(self, limit=limit, before=before, after=after, page_size=page_size, offset=offset, raw=raw)
+
     def __repr__(self) -> str:
         return f"<TextChannel id={self.id} name={self.name} teamId={self.team_id}>"
 
@@ -124,6 +158,9 @@ class TodoChannel:
 
     def __init__(self, state: ConnectionState, data: TodoChannelPayload) -> None:
         self._state: ConnectionState = state
+        self._update(data)
+
+    def _update(self, data: TodoChannelPayload) -> None:
         self.id: str = data['id']
         self.type: str = data['type']
         self.team_id: str = data['teamId']
@@ -202,6 +239,9 @@ class WatchStreamChannel:
 
     def __init__(self, state: ConnectionState, data: WatchStreamPayload) -> None:
         self._state: ConnectionState = state
+        self._update(data)
+
+    def _update(self, data: WatchStreamPayload) -> None:
         self.id: str = data['id']
         self.type: str = data['type']
         self.team_id: str = data['teamId']
@@ -259,6 +299,9 @@ class VoiceChannel:
 
     def __init__(self, state: ConnectionState, data: VoiceChannelPayload) -> None:
         self._state: ConnectionState = state
+        self._update(data)
+
+    def _update(self, data: VoiceChannelPayload) -> None:
         self.id: str = data['id']
         self.type: str = data['type']
         self.team_id: str = data['teamId']
@@ -321,6 +364,9 @@ class AnnouncementChannel:
 
     def __init__(self, state: ConnectionState, data: AnnouncementChannelPayload) -> None:
         self._state: ConnectionState = state
+        self._update(data)
+
+    def _update(self, data: AnnouncementChannelPayload) -> None:
         self.id: str = data['id']
         self.type: str = data['type']
         self.team_id: str = data['teamId']
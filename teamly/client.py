@@ -23,12 +23,23 @@ SOFTWARE.
 '''
 
 import asyncio
+import aiohttp
+import time
 
 from teamly.logging import enable_debug
-from teamly.user import ClientUser
-
-from .http import HTTPClient
-from .gateway import TeamlyWebSocket
+from teamly.user import ClientUser, User
+
+from .backoff import ExponentialBackoff
+from .cache import EntityCache, ResponseCache
+from .member import Member
+from .message import Message
+from .role import Role
+from .team import Team
+from .utils import JSONCodec
+from .dispatcher import EventDispatcher, OverflowPolicy
+from .outbox import Outbox
+from .http import HTTPClient, CompressMode, RetryPolicy
+from .gateway import TeamlyWebSocket, GatewayMetrics, ConnectionClosed, FATAL_CLOSE_CODES
 from .state import ConnectionState
 
 from loguru import logger
@@ -36,6 +47,8 @@ from typing import (
     Dict,
     List,
     Optional,
+    Tuple,
+    Union,
     TypeVar,
     Callable,
     Coroutine,
@@ -70,18 +83,77 @@ class Client:
         self,
         *,
         enable_debug: bool = False,
-        cache_size: int = 1000
+        cache_size: int = 1000,
+        max_messages: int = 0,
+        cache_ttl: Optional[float] = None,
+        warm_cache: bool = False,
+        warm_teams: Optional[List[str]] = None,
+        cache_snapshot: Optional[str] = None,
+        cache_snapshot_max_age: Optional[float] = 86400.0,
+        max_queue_size: int = 1000,
+        workers: int = 4,
+        overflow: OverflowPolicy = 'drop_oldest',
+        max_spill_size: int = 10000,
+        event_concurrency: Optional[Dict[str, int]] = None,
+        json_codec: Optional[Union[str, JSONCodec]] = None,
+        compress: Optional[CompressMode] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        connector: Optional[aiohttp.BaseConnector] = None,
+        session: Optional[aiohttp.ClientSession] = None,
+        connection_limit: int = 100,
+        connection_limit_per_host: int = 20,
+        keepalive_timeout: float = 30.0,
+        dns_cache_ttl: Optional[int] = 300,
+        response_cache: Optional[ResponseCache] = None,
+        coalesce_messages: bool = False
     ) -> None:
+        if not isinstance(json_codec, JSONCodec):
+            json_codec = JSONCodec.from_name(json_codec)
+
         self.loop: asyncio.AbstractEventLoop = _loop
-        self.http: HTTPClient = HTTPClient(self.loop)
+        self.http: HTTPClient = HTTPClient(
+            self.loop,
+            codec=json_codec,
+            retry_policy=retry_policy,
+            connector=connector,
+            session=session,
+            limit=connection_limit,
+            limit_per_host=connection_limit_per_host,
+            keepalive_timeout=keepalive_timeout,
+            dns_cache_ttl=dns_cache_ttl,
+            response_cache=response_cache
+        )
         self.cache_size: int = cache_size
+        self.max_messages: int = max_messages
+        self.cache_ttl: Optional[float] = cache_ttl
+        self.warm_cache: bool = warm_cache
+        self.warm_teams: List[str] = warm_teams or []
+        self.cache_snapshot: Optional[str] = cache_snapshot
+        self.cache_snapshot_max_age: Optional[float] = cache_snapshot_max_age
+        self.compress: Optional[CompressMode] = compress
+        self.outbox: Outbox = Outbox(self.http, coalesce=coalesce_messages)
         self.ws: TeamlyWebSocket = None #type: ignore
-        self._listener: Dict[str,List[str]] = {}
+        self._receive_task: Optional[asyncio.Task] = None
+        self._closed: bool = False
+        self._listeners: Dict[str, Tuple[Callable[..., Coro[Any]], ...]] = {}
+        self._dispatcher: EventDispatcher = EventDispatcher(
+            self._run_event,
+            max_size=max_queue_size,
+            workers=workers,
+            overflow=overflow,
+            max_spill=max_spill_size,
+            concurrency=event_concurrency
+        )
 
         self.enable_debug: bool = enable_debug
 
         self._connection: ConnectionState = self._get_state()
 
+        # handlers defined on a subclass, e.g. "async def on_ready(self)"
+        for attr in dir(type(self)):
+            if attr.startswith('on_') and asyncio.iscoroutinefunction(getattr(type(self), attr)):
+                self.add_listener(getattr(self, attr), attr[3:])
+
     def run(self, token: str) -> None:
         """
         Starts the client using the provided token.
@@ -111,19 +183,88 @@ class Client:
             pass
 
     async def start(self, token: str) -> None:
+        if self.cache_snapshot is not None:
+            try:
+                await self._connection.load_snapshot(self.cache_snapshot, max_age=self.cache_snapshot_max_age)
+            except Exception as e:
+                logger.warning("Could not load the cache snapshot: {}", e)
+
         await self.http.static_login(token)
         await self.connect()
 
-    async def connect(self) -> None:
-        try:
-            coro = TeamlyWebSocket.from_client(self)
-            self.ws = await asyncio.wait_for(coro,timeout=30)
-            while True: #temporaly
-                await self.ws.poll_event()
-                await asyncio.sleep(1)
-        except Exception as e:
-            logger.error("Exception error: {}",e)
-            await self.close()
+    async def connect(self, *, reconnect: bool = True) -> None:
+        """
+        Opens the gateway connection and keeps it alive.
+
+        When the connection drops because of a network error, a zombie
+        heartbeat or the server closing it, a new connection is opened after
+        a jittered exponential backoff. The HTTP session and the logged in
+        user are reused, so a reconnect costs a single websocket handshake.
+
+        A handshake rejected with a 4xx status (other than 429) or a close
+        code in ``FATAL_CLOSE_CODES`` can't be fixed by retrying, the client
+        is closed and the error is raised.
+
+        Parameters:
+            reconnect (bool): Whether to reconnect after the connection is lost.
+        """
+
+        backoff = ExponentialBackoff()
+        disconnected_at: Optional[float] = None
+
+        while not self._closed:
+            try:
+                coro = TeamlyWebSocket.from_client(self)
+                self.ws = await asyncio.wait_for(coro,timeout=30)
+
+                if disconnected_at is not None:
+                    logger.info("Reconnected to the gateway in {:.2f} seconds", time.perf_counter() - disconnected_at)
+                    disconnected_at = None
+                backoff.reset()
+
+                self._receive_task = self.loop.create_task(self.ws.receive_loop(), name="Teamly.py: receive loop")
+                try:
+                    await self._receive_task
+                finally:
+                    # the socket may have been closed by the server, stop its
+                    # heartbeat before it acts on the dead connection
+                    close_code = self.ws.socket.close_code
+                    await self.ws.close()
+
+                if close_code in FATAL_CLOSE_CODES:
+                    raise ConnectionClosed(close_code)
+            except ConnectionClosed as e:
+                logger.error("{}, not reconnecting", e)
+                await self.close()
+                raise
+            except aiohttp.WSServerHandshakeError as e:
+                # a rejected token or a bad request fails the same way every time
+                if 400 <= e.status < 500 and e.status != 429:
+                    logger.error("Gateway refused the connection with status {}: {}", e.status, e.message)
+                    await self.close()
+                    raise
+                logger.warning("Gateway connection failed: {}", e)
+            except (OSError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning("Gateway connection failed: {}", e)
+            except Exception as e:
+                logger.error("Exception error: {}",e)
+                await self.close()
+                return
+
+            if self._closed or not reconnect:
+                break
+
+            if disconnected_at is None:
+                disconnected_at = time.perf_counter()
+
+            if self.ws is not None and self.ws.should_reconnect:
+                self.ws.should_reconnect = False
+                logger.info("Reconnecting to the gateway...")
+                continue
+
+            delay = backoff.delay()
+            logger.info("Connection lost, reconnecting in {:.2f} seconds", delay)
+            await asyncio.sleep(delay)
 
     def event(self, coro: CoroT, /) -> CoroT:
         """
@@ -131,6 +272,7 @@ class Client:
 
         Use this as a decorator to bind custom event listeners like `on_ready`,
         `on_message`, etc. The method name must start with `on_` to be recognized.
+        Registering several functions for the same event runs all of them.
 
         Example:
             @client.event
@@ -143,6 +285,53 @@ class Client:
         Returns:
             Callable: The same coroutine function.
 
+        Raises:
+            TypeError: If the function is not a coroutine.
+            ValueError: If the function name does not start with `on_`.
+        """
+
+        if not coro.__name__.startswith('on_'):
+            raise ValueError(f"event name '{coro.__name__}' must start with 'on_'")
+
+        self.add_listener(coro, coro.__name__[3:])
+        return coro
+
+    def listen(self, name: Optional[str] = None) -> Callable[[CoroT], CoroT]:
+        """
+        Decorator that registers a listener for an event.
+
+        Unlike `event` the function can have any name when `name` is given.
+
+        Example:
+            @client.listen("message")
+            async def log_message(message):
+                print(message)
+
+        Parameters:
+            name (Optional[str]): The event name without the `on_` prefix.
+                Defaults to the function name minus `on_`.
+        """
+
+        def decorator(coro: CoroT) -> CoroT:
+            event = name
+            if event is None:
+                if not coro.__name__.startswith('on_'):
+                    raise ValueError(f"event name '{coro.__name__}' must start with 'on_'")
+                event = coro.__name__[3:]
+
+            self.add_listener(coro, event)
+            return coro
+
+        return decorator
+
+    def add_listener(self, coro: Callable[..., Coro[Any]], name: str) -> None:
+        """
+        Adds a listener for an event at runtime.
+
+        Parameters:
+            coro (Callable): The coroutine function to call.
+            name (str): The event name without the `on_` prefix, e.g. `message`.
+
         Raises:
             TypeError: If the function is not a coroutine.
         """
@@ -150,9 +339,25 @@ class Client:
         if not asyncio.iscoroutinefunction(coro):
             raise TypeError("event registered must be a coroutine function")
 
-        setattr(self, coro.__name__, coro)
-        logger.debug("\"{}\" has successfully been registered as an event",coro.__name__)
-        return coro
+        self._listeners[name] = self._listeners.get(name, ()) + (coro,)
+        self._connection.update_subscriptions(self._listeners)
+        logger.debug("\"{}\" has successfully been registered for the \"{}\" event",coro.__name__,name)
+
+    def remove_listener(self, coro: Callable[..., Coro[Any]], name: str) -> None:
+        """
+        Removes a listener added with `event`, `listen` or `add_listener`.
+
+        Parameters:
+            coro (Callable): The coroutine function to remove.
+            name (str): The event name without the `on_` prefix.
+        """
+
+        listeners = tuple(c for c in self._listeners.get(name, ()) if c != coro)
+        if listeners:
+            self._listeners[name] = listeners
+        else:
+            self._listeners.pop(name, None)
+        self._connection.update_subscriptions(self._listeners)
 
     async def _run_event(
         self,
@@ -172,20 +377,17 @@ class Client:
         event_name: str,
         *arg,
         **kwargs
-    ) -> asyncio.Task:
-        wrapper = self._run_event(coro, event_name, *arg, **kwargs)
-        #scheduls event
-        return self.loop.create_task(wrapper, name=f"Teamly.py: {event_name}")
+    ) -> None:
+        #queues the event for the dispatch workers
+        self._dispatcher.put(event_name, coro, arg, kwargs)
 
     def dispatch(self, event: str, /, *arg: Any, **kwargs: Any):
-        method = 'on_' + event
+        listeners = self._listeners.get(event)
+        if listeners is None:
+            return
 
-        try:
-            coro = getattr(self,method)
-        except AttributeError:
-            pass
-        else:
-            self._schedul_event(coro, method, *arg, **kwargs)
+        for coro in listeners:
+            self._schedul_event(coro, event, *arg, **kwargs)
 
 
     async def _async_setup_hook(self):
@@ -193,6 +395,7 @@ class Client:
         loop = asyncio.get_running_loop()
         self.loop = loop
         self.http.loop = loop
+        self._dispatcher.start(loop)
 
     async def close(self):
         """
@@ -201,12 +404,112 @@ class Client:
         This method should be used when you want to shut down the client cleanly,
         such as during application shutdown or error handling.
         """
+        if self._closed:
+            return
+
+        self._closed = True
         if self.ws is not None:
             await self.ws.close()
+        await self._dispatcher.stop()
+        await self.outbox.close()
+
+        if self.cache_snapshot is not None:
+            try:
+                await self._connection.save_snapshot(self.cache_snapshot)
+            except Exception as e:
+                logger.warning("Could not save the cache snapshot: {}", e)
         await self.http.close()
 
+    @property
+    def gateway_metrics(self) -> Optional[GatewayMetrics]:
+        """
+        Returns the receive loop counters of the current gateway connection.
+
+        Returns:
+            Optional[GatewayMetrics]: ``None`` if the client is not connected.
+        """
+        if self.ws is None:
+            return None
+        return self.ws.metrics
+
+    @property
+    def dispatcher(self) -> EventDispatcher:
+        """
+        Returns the engine that runs event handlers.
+
+        Use it to inspect the queue depth (``dispatcher.depth``), dropped
+        events and per-event handler latency (``dispatcher.stats``).
+
+        Returns:
+            EventDispatcher: The dispatch engine of this client.
+        """
+        return self._dispatcher
+
     def _get_state(self):
-        return ConnectionState(dispatch=self.dispatch,http=self.http)
+        return ConnectionState(
+            dispatch=self.dispatch,
+            http=self.http,
+            cache_size=self.cache_size,
+            max_messages=self.max_messages,
+            cache_ttl=self.cache_ttl,
+            warm_cache=self.warm_cache,
+            warm_teams=self.warm_teams
+        )
+
+    @property
+    def cache(self) -> EntityCache:
+        """
+        Returns the entity cache that backs the `get_*` methods.
+
+        Returns:
+            EntityCache: The cache, with per-kind hit and miss counters.
+        """
+        return self._connection.cache
+
+    def get_team(self, teamId: str) -> Optional[Team]:
+        """Returns a team from the cache, or ``None`` if it is not cached."""
+        return self._connection.get_team(teamId)
+
+    def get_channel(self, channelId: str):
+        """Returns a channel from the cache, or ``None`` if it is not cached."""
+        return self._connection.get_channel(channelId)
+
+    def get_role(self, roleId: str) -> Optional[Role]:
+        """Returns a role from the cache, or ``None`` if it is not cached."""
+        return self._connection.get_role(roleId)
+
+    def get_member(self, teamId: str, userId: str) -> Optional[Member]:
+        """Returns a team member from the cache, or ``None`` if it is not cached."""
+        return self._connection.get_member(teamId, userId)
+
+    def get_user(self, userId: str) -> Optional[User]:
+        """Returns a user from the cache, or ``None`` if it is not cached."""
+        return self._connection.get_user(userId)
+
+    def get_message(self, messageId: str) -> Optional[Message]:
+        """Returns a message from the cache, or ``None`` if it is not cached.
+
+        Messages are only cached when the client was created with `max_messages`.
+        """
+        return self._connection.get_message(messageId)
+
+    async def fetch_user(self, userId: str) -> User:
+        """
+        Returns a user, from the cache when possible or else from the API.
+
+        Parameters:
+            userId (str): The id of the user.
+        """
+        return await self._connection.fetch_user(userId)
+
+    async def fetch_team(self, teamId: str) -> Team:
+        """
+        Returns a team, from the cache when possible or else from the API.
+
+        Parameters:
+            teamId (str): The id of the team.
+        """
+        return await self._connection.fetch_team(teamId)
 
     @property
     def user(self) -> Optional[ClientUser]:
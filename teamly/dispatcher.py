@@ -0,0 +1,303 @@
+'''
+MIT License
+
+Copyright (c) 2025 Fatih Kuloglu
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+'''
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+from collections import deque
+from loguru import logger
+from typing import Any, Callable, Coroutine, Deque, Dict, List, Literal, Optional, Tuple
+
+__all__ = (
+    'EventDispatcher',
+    'HandlerStats',
+)
+
+OverflowPolicy = Literal['drop_oldest', 'block', 'spill']
+
+# (event, coro, args, kwargs, enqueued_at)
+_Job = Tuple[str, Callable[..., Coroutine[Any, Any, Any]], Tuple[Any, ...], Dict[str, Any], float]
+
+
+class HandlerStats:
+    """Latency counters of the handlers of a single event.
+
+    Attributes
+    ----------
+    count: int
+        How many handlers have finished.
+    total: float
+        Seconds spent running handlers in total.
+    max: float
+        The slowest handler run in seconds.
+    wait: float
+        Seconds the last handler spent in the queue before it started.
+    """
+
+    __slots__ = ('count', 'total', 'max', 'wait')
+
+    def __init__(self) -> None:
+        self.count: int = 0
+        self.total: float = 0.0
+        self.max: float = 0.0
+        self.wait: float = 0.0
+
+    @property
+    def average(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def __repr__(self) -> str:
+        return f"<HandlerStats count={self.count} average={self.average:.4f} max={self.max:.4f} wait={self.wait:.4f}>"
+
+
+class EventDispatcher:
+    """Runs event handlers from a bounded queue on a fixed pool of workers.
+
+    Parameters
+    ----------
+    runner: Callable
+        Coroutine function that runs a single handler, called as
+        ``runner(coro, event, *args, **kwargs)``.
+    max_size: int
+        How many handler calls can wait in the queue.
+    workers: int
+        How many handlers can run at the same time.
+    overflow: str
+        What happens when the queue is full:
+
+        - ``'drop_oldest'`` drops the oldest waiting handler call.
+        - ``'block'`` keeps the call aside and makes the gateway stop reading
+          until the queue has room again, see :meth:`wait`.
+        - ``'spill'`` keeps the call in an overflow queue of up to
+          ``max_spill`` calls that the workers drain after the bounded one.
+          Once that is full too the oldest spilled call is dropped.
+    max_spill: int
+        How many handler calls the ``'spill'`` overflow queue holds.
+    concurrency: Dict[str, int]
+        Maximum number of handlers running at once per event name,
+        e.g. ``{"message": 2}``. Calls over the limit wait in a lane of their
+        event without holding a worker, so other events keep running.
+    """
+
+    def __init__(
+        self,
+        runner: Callable[..., Coroutine[Any, Any, Any]],
+        *,
+        max_size: int = 1000,
+        workers: int = 4,
+        overflow: OverflowPolicy = 'drop_oldest',
+        max_spill: int = 10000,
+        concurrency: Optional[Dict[str, int]] = None
+    ) -> None:
+        if overflow not in ('drop_oldest', 'block', 'spill'):
+            raise ValueError(f"Unknown overflow policy: '{overflow}'")
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        if max_spill < 0:
+            raise ValueError("max_spill must not be negative")
+
+        self._runner = runner
+        self.max_size: int = max_size
+        self.overflow: OverflowPolicy = overflow
+        self.max_spill: int = max_spill
+        self._worker_count: int = workers
+        self._concurrency: Dict[str, int] = concurrency or {}
+
+        self._queue: Deque[_Job] = deque()
+        self._overflow: Deque[_Job] = deque()
+        self._workers: List[asyncio.Task] = []
+        # calls of a limited event taken off the queue while its limit was full
+        self._parked: Dict[str, Deque[_Job]] = {}
+        self._parked_count: int = 0
+        self._running: Dict[str, int] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._space: Optional[asyncio.Event] = None
+
+        self.dropped: int = 0
+        self.stats: Dict[str, HandlerStats] = {}
+
+    @property
+    def depth(self) -> int:
+        """Handler calls waiting to run, including the overflow queue."""
+        return len(self._queue) + self._parked_count + len(self._overflow)
+
+    @property
+    def _size(self) -> int:
+        return len(self._queue) + self._parked_count
+
+    @property
+    def blocked(self) -> bool:
+        """Whether the reader has to wait before producing more events."""
+        return self.overflow == 'block' and bool(self._overflow)
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        if self._workers:
+            return
+
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Event()
+        self._workers = [
+            loop.create_task(self._worker(), name=f"Teamly.py: dispatch worker {i}")
+            for i in range(self._worker_count)
+        ]
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def put(
+        self,
+        event: str,
+        coro: Callable[..., Coroutine[Any, Any, Any]],
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any]
+    ) -> None:
+        job: _Job = (event, coro, args, kwargs, time.perf_counter())
+
+        if self._size < self.max_size:
+            self._queue.append(job)
+        elif self.overflow == 'drop_oldest':
+            dropped = self._queue.popleft() if self._queue else self._pop_parked()
+            self.dropped += 1
+            logger.warning("Event queue is full, dropped a pending '{}' handler", dropped[0])
+            self._queue.append(job)
+        elif self.overflow == 'spill' and len(self._overflow) >= self.max_spill:
+            self.dropped += 1
+            if self._overflow:
+                dropped = self._overflow.popleft()
+                self._overflow.append(job)
+            else:
+                dropped = job
+            logger.warning("Event overflow queue is full, dropped a pending '{}' handler", dropped[0])
+        else:
+            self._overflow.append(job)
+
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def wait(self) -> None:
+        """Waits until the overflowed handler calls fit into the queue again."""
+        while self.blocked:
+            self._space.clear() #type: ignore
+            await self._space.wait() #type: ignore
+
+    def _pop_parked(self, event: Optional[str] = None) -> _Job:
+        if event is None:
+            event = next(e for e, lane in self._parked.items() if lane)
+        lane = self._parked[event]
+        job = lane.popleft()
+        if not lane:
+            del self._parked[event]
+        self._parked_count -= 1
+        return job
+
+    def _has_room(self, event: str) -> bool:
+        limit = self._concurrency.get(event)
+        return limit is None or self._running.get(event, 0) < limit
+
+    def _next(self) -> Optional[_Job]:
+        # parked calls are the oldest of their event, they go first once
+        # their limit has room again
+        for event in self._parked:
+            if self._has_room(event):
+                return self._pop_parked(event)
+
+        while True:
+            if self._queue:
+                job = self._queue.popleft()
+            elif self._overflow:
+                job = self._overflow.popleft()
+            else:
+                return None
+
+            while self._overflow and self._size < self.max_size:
+                self._queue.append(self._overflow.popleft())
+
+            if not self._overflow:
+                self._space.set() #type: ignore
+
+            event = job[0]
+            if self._has_room(event) and event not in self._parked:
+                return job
+
+            # the limit is full, set the call aside instead of holding a worker
+            self._parked.setdefault(event, deque()).append(job)
+            self._parked_count += 1
+
+    async def _worker(self) -> None:
+        while True:
+            job = self._next()
+            if job is None:
+                self._wakeup.clear() #type: ignore
+                await self._wakeup.wait() #type: ignore
+                continue
+
+            event, coro, args, kwargs, enqueued_at = job
+
+            if event not in self._concurrency:
+                await self._run(event, coro, args, kwargs, enqueued_at)
+                continue
+
+            self._running[event] = self._running.get(event, 0) + 1
+            try:
+                await self._run(event, coro, args, kwargs, enqueued_at)
+            finally:
+                self._running[event] -= 1
+                if event in self._parked:
+                    # idle workers may be waiting for this slot
+                    self._wakeup.set() #type: ignore
+
+    async def _run(
+        self,
+        event: str,
+        coro: Callable[..., Coroutine[Any, Any, Any]],
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any],
+        enqueued_at: float
+    ) -> None:
+        start = time.perf_counter()
+        try:
+            await self._runner(coro, event, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+
+            try:
+                stats = self.stats[event]
+            except KeyError:
+                stats = self.stats[event] = HandlerStats()
+
+            stats.count += 1
+            stats.total += elapsed
+            stats.wait = start - enqueued_at
+            if elapsed > stats.max:
+                stats.max = elapsed
+
+    def __repr__(self) -> str:
+        return f"<EventDispatcher depth={self.depth} workers={len(self._workers)} overflow={self.overflow!r} dropped={self.dropped}>"
@@ -0,0 +1,273 @@
+'''
+MIT License
+
+Copyright (c) 2025 Fatih Kuloglu
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+'''
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import os
+import time
+
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, BinaryIO, Dict, List, Optional
+from loguru import logger
+
+from .channel import TextChannel
+from .iterators import _as_datetime
+
+if TYPE_CHECKING:
+    from .state import ConnectionState
+    from .team import Team
+
+__all__ = (
+    'ExportStats',
+    'ChannelExporter',
+)
+
+
+class ExportStats:
+    """Throughput counters of a :class:`ChannelExporter`."""
+
+    __slots__ = ('channels', 'pages', 'messages', 'bytes', 'started', 'finished')
+
+    def __init__(self) -> None:
+        self.channels: int = 0
+        self.pages: int = 0
+        self.messages: int = 0
+        self.bytes: int = 0
+        self.started: float = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def messages_per_second(self) -> float:
+        elapsed = self.elapsed
+        return self.messages / elapsed if elapsed else 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"<ExportStats channels={self.channels} messages={self.messages} bytes={self.bytes} "
+            f"elapsed={self.elapsed:.1f} messagesPerSecond={self.messages_per_second:.1f}>"
+        )
+
+
+class ChannelExporter:
+    """Archives channel messages to JSON Lines files, one message per line,
+    each as the payload the API returned.
+
+    The history is read with :meth:`TextChannel.history` and written a page
+    at a time while the next page is fetched, so memory use does not depend
+    on the size of the channel. Progress is recorded in a checkpoint file
+    after every page and an interrupted export resumes after the last
+    message it wrote.
+
+    Parameters
+    ----------
+    state: ConnectionState
+        The state of the client, see :attr:`Client._connection`.
+    directory: str
+        Where the ``<channelId>.jsonl`` files and the checkpoint are written.
+    compress: bool
+        Writes ``<channelId>.jsonl.gz`` files instead.
+    page_size: int
+        Messages requested per page.
+    concurrency: int
+        The number of channels exported at the same time.
+    """
+
+    CHECKPOINT = "export-checkpoint.json"
+
+    def __init__(
+        self,
+        state: ConnectionState,
+        directory: str,
+        *,
+        compress: bool = False,
+        page_size: int = 50,
+        concurrency: int = 4
+    ) -> None:
+        self._state: ConnectionState = state
+        self.directory: str = directory
+        self.compress: bool = compress
+        self.page_size: int = page_size
+        self.concurrency: int = concurrency
+        self.stats: ExportStats = ExportStats()
+
+        os.makedirs(directory, exist_ok=True)
+        self._checkpoint_path: str = os.path.join(directory, self.CHECKPOINT)
+        self._checkpoint: Dict[str, Dict[str, Any]] = self._load_checkpoint()
+        self._checkpoint_lock: asyncio.Lock = asyncio.Lock()
+
+    def _load_checkpoint(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self._checkpoint_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            logger.warning("Ignoring unreadable export checkpoint {}", self._checkpoint_path)
+            return {}
+
+    def _write_checkpoint(self, data: str) -> None:
+        # write then rename so a crash never leaves a truncated checkpoint
+        tmp = self._checkpoint_path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp, self._checkpoint_path)
+
+    async def _save_checkpoint(self) -> None:
+        # serialized on the loop, the channels exported meanwhile keep
+        # updating their progress while the file is written
+        async with self._checkpoint_lock:
+            await asyncio.to_thread(self._write_checkpoint, json.dumps(self._checkpoint))
+
+    def path_for(self, channelId: str) -> str:
+        return os.path.join(self.directory, f"{channelId}.jsonl" + (".gz" if self.compress else ""))
+
+    def _open(self, channelId: str, mode: str = 'ab') -> BinaryIO:
+        # appending keeps what an interrupted run already wrote, a gzip file
+        # with several members is still read back as one stream
+        path = self.path_for(channelId)
+        if self.compress:
+            return gzip.open(path, mode) #type: ignore
+        return open(path, mode)
+
+    async def _write(self, fh: BinaryIO, progress: Dict[str, Any], batch: List[Dict[str, Any]], position: int) -> int:
+        dumps = self._state.http.codec.dumps
+        chunk = b"".join(dumps(m) + b"\n" for m in batch)
+        await asyncio.to_thread(fh.write, chunk)
+        await asyncio.to_thread(fh.flush)
+
+        self.stats.pages += 1
+        self.stats.messages += len(batch)
+        self.stats.bytes += len(chunk)
+        progress["offset"] = position
+        progress["lastId"] = batch[-1]['id']
+        progress["lastCreatedAt"] = batch[-1]['createdAt']
+        progress["count"] += len(batch)
+        await self._save_checkpoint()
+        return len(batch)
+
+    async def _export_from(self, channel: TextChannel, fh: BinaryIO, progress: Dict[str, Any], offset: int) -> Optional[int]:
+        # Returns ``None`` when the history starting at ``offset`` is already
+        # older than the checkpoint, messages deleted since the last run
+        # shifted the offsets and the walk has to start over from the top.
+        page_size = self.page_size
+        anchor: Optional[datetime] = _as_datetime(progress["lastCreatedAt"]) if progress["lastCreatedAt"] else None
+        last_id: Optional[str] = progress["lastId"]
+        # raw payloads, the archive keeps every field the API sent
+        history = channel.history(limit=None, page_size=page_size, offset=offset, raw=True)
+        batch: List[Dict[str, Any]] = []
+        position = offset
+        written = 0
+        try:
+            async for message in history:
+                position += 1
+                if anchor is not None:
+                    created_at = _as_datetime(message['createdAt'])
+                    if position == offset + 1 and offset and created_at < anchor:
+                        return None
+                    # compared by time, the checkpointed message itself may
+                    # have been deleted since
+                    if created_at > anchor or message['id'] == last_id:
+                        continue
+                    anchor = None
+
+                batch.append(message)
+                if len(batch) >= page_size:
+                    written += await self._write(fh, progress, batch, position)
+                    batch = []
+        finally:
+            history.close()
+
+        if anchor is not None and offset and position == offset:
+            # nothing left at the old offset, the channel shrank
+            return None
+        if batch:
+            written += await self._write(fh, progress, batch, position)
+        return written
+
+    async def export_channel(self, channel: TextChannel) -> int:
+        """Exports a single channel and returns the number of messages written."""
+
+        progress = self._checkpoint.setdefault(
+            channel.id,
+            {"offset": 0, "count": 0, "lastId": None, "lastCreatedAt": None, "done": False}
+        )
+        if progress["done"]:
+            logger.debug("Channel {} was already exported", channel.id)
+            return 0
+
+        mode = 'ab'
+        if progress["count"] and not progress.get("lastCreatedAt"):
+            logger.warning("Checkpoint of channel {} has no resume point, exporting it again", channel.id)
+            progress.update(offset=0, count=0, lastId=None, lastCreatedAt=None)
+            mode = 'wb'
+
+        # on resume the page before the checkpoint is read again, messages
+        # posted meanwhile shift the offsets and nothing may be missed
+        offset = max(0, progress["offset"] - self.page_size) if progress["lastCreatedAt"] else 0
+
+        fh = self._open(channel.id, mode)
+        try:
+            written = await self._export_from(channel, fh, progress, offset)
+            if written is None:
+                logger.warning(
+                    "Channel {} changed since the checkpoint at offset {}, reading it again from the newest message",
+                    channel.id, offset
+                )
+                written = await self._export_from(channel, fh, progress, 0)
+        finally:
+            await asyncio.to_thread(fh.close)
+
+        progress["done"] = True
+        await self._save_checkpoint()
+
+        self.stats.channels += 1
+        logger.info("Exported {} messages from channel {}", written, channel.id)
+        return written
+
+    async def export_team(self, team: Team) -> ExportStats:
+        """Exports every text channel of ``team``, ``concurrency`` channels at a time."""
+
+        channels: List[TextChannel] = [c for c in await team.fetch_channels(refresh=True) if isinstance(c, TextChannel)]
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(channel: TextChannel) -> None:
+            async with semaphore:
+                await self.export_channel(channel)
+
+        await asyncio.gather(*(run(c) for c in channels))
+        self.stats.finished = time.perf_counter()
+        logger.info("Team export finished {}", self.stats)
+        return self.stats
+
+    async def reset(self) -> None:
+        """Forgets the checkpoint, the next export starts from scratch."""
+        self._checkpoint.clear()
+        await self._save_checkpoint()
@@ -25,9 +25,9 @@ SOFTWARE.
 from __future__ import annotations
 
 import asyncio
-import threading
 import aiohttp
 import time
+import zlib
 
 from typing import TYPE_CHECKING, Any, Optional, Dict, Callable
 from loguru import logger
@@ -38,6 +38,30 @@ from .state import ConnectionState
 
 if TYPE_CHECKING:
     from .client import Client
+    from .cache import ResponseCache
+    from .dispatcher import EventDispatcher
+
+ZLIB_SUFFIX = b'\x00\x00\xff\xff'
+
+# close codes after which connecting again with the same token can't succeed:
+# authentication failed, invalid shard, sharding required, invalid API
+# version, invalid and disallowed intents
+FATAL_CLOSE_CODES = frozenset({4004, 4010, 4011, 4012, 4013, 4014})
+
+
+class ConnectionClosed(Exception):
+    """Raised by :meth:`Client.connect` when the gateway closed the
+    connection with one of the :data:`FATAL_CLOSE_CODES`.
+
+    Attributes
+    ----------
+    code: int
+        The close code sent by the gateway.
+    """
+
+    def __init__(self, code: int) -> None:
+        self.code: int = code
+        super().__init__(f"The gateway closed the connection with code {code}")
 
 
 class GatewayRatelimiter:
@@ -78,33 +102,100 @@ class GatewayRatelimiter:
                 await asyncio.sleep(delta)
 
 
-class KeepAliveHandler(threading.Thread):
+class GatewayMetrics:
+    """Throughput counters for the gateway receive loop.
+
+    Attributes
+    ----------
+    events: int
+        Total number of frames handled on this connection.
+    events_per_second: float
+        Frames handled during the last completed one second window.
+    parse_time: float
+        Seconds spent decoding and parsing the last frame, from reading it
+        to its parser returning. How long handlers wait to run is tracked
+        by :attr:`EventDispatcher.stats`.
+    max_parse_time: float
+        The highest ``parse_time`` seen on this connection.
+    compressed_bytes: int
+        Bytes received on a ``zlib-stream`` connection before inflating.
+    decompressed_bytes: int
+        Bytes those frames inflated to.
+    """
+
+    __slots__ = (
+        'events',
+        'events_per_second',
+        'parse_time',
+        'max_parse_time',
+        'compressed_bytes',
+        'decompressed_bytes',
+        '_window_start',
+        '_window_count'
+    )
+
+    def __init__(self) -> None:
+        self.events: int = 0
+        self.events_per_second: float = 0.0
+        self.parse_time: float = 0.0
+        self.max_parse_time: float = 0.0
+        self.compressed_bytes: int = 0
+        self.decompressed_bytes: int = 0
+        self._window_start: float = time.perf_counter()
+        self._window_count: int = 0
+
+    def record(self, received: float) -> None:
+        now = time.perf_counter()
+
+        self.events += 1
+        self.parse_time = now - received
+        if self.parse_time > self.max_parse_time:
+            self.max_parse_time = self.parse_time
+
+        self._window_count += 1
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            self.events_per_second = self._window_count / elapsed
+            self._window_start = now
+            self._window_count = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"<GatewayMetrics events={self.events} eventsPerSecond={self.events_per_second:.1f} "
+            f"parseTime={self.parse_time:.4f} maxParseTime={self.max_parse_time:.4f}>"
+        )
+
+
+class KeepAliveHandler:
 
     def __init__(self, ws: TeamlyWebSocket,interval: Optional[float] = None):
-            super().__init__(daemon=True)
             self.ws: TeamlyWebSocket = ws
             self.interval: Optional[float] = interval
             self.behind_msg: str = 'Can\'t keep up, websocket is {} behind.'
-            self._stop_event: threading.Event = threading.Event()
+            self._task: Optional[asyncio.Task] = None
             self._last_send: float = time.perf_counter()
             self._last_ack: float = time.perf_counter()
             self.latency: float = float('inf')
 
-    def run(self):
-        while not self._stop_event.wait(self.interval):
+    def start(self):
+        self._task = self.ws.loop.create_task(self.run(), name="Teamly.py: heartbeat")
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval) #type: ignore
+
             if time.perf_counter() - self._last_ack > self.interval * 2: #type: ignore
-                logger.warning("[KeepAliveHandler] ACK not received, connection may be dead.")
-                continue
+                logger.warning("[KeepAliveHandler] ACK not received, connection is a zombie. Reconnecting...")
+                await self.ws.reconnect()
+                return
 
             self._last_send = time.perf_counter()
 
             data = self.get_payload()
-            coro = self.ws.send_heartbeat(data)
-            future = asyncio.run_coroutine_threadsafe(coro, self.ws.loop)
             try:
-                future.result(timeout=10)
+                await asyncio.wait_for(self.ws.send_heartbeat(data), timeout=10)
             except Exception as e:
-                logger.error("[KeepAliveHandler] send error:", e)
+                logger.error("[KeepAliveHandler] send error: {}", e)
 
     def get_payload(self) -> Dict[str, Any]:
         return {
@@ -113,7 +204,9 @@ class KeepAliveHandler(threading.Thread):
         }
 
     def stop(self):
-        self._stop_event.set()
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+        self._task = None
 
     def ack(self):
         ack_time = time.perf_counter()
@@ -130,20 +223,33 @@ class TeamlyWebSocket:
     if TYPE_CHECKING:
         _connection: ConnectionState
         _dispatch_parsers: Dict[str, Callable[..., Any]]
+        _dispatcher: EventDispatcher
+        _codec: utils.JSONCodec
+        _response_cache: Optional[ResponseCache]
 
     def __init__(self, socket: aiohttp.ClientWebSocketResponse,*, loop: asyncio.AbstractEventLoop) -> None: #type: ignore
         self.socket: aiohttp.ClientWebSocketResponse = socket
         self._keep_alive: Optional[KeepAliveHandler] = None
         self.loop: asyncio.AbstractEventLoop = loop
         self._close_code: Optional[int] = None
+        self.should_reconnect: bool = False
+        self._zlib: Optional[zlib._Decompress] = None
+        self._buffer: bytearray = bytearray()
+        self.metrics: GatewayMetrics = GatewayMetrics()
 
     @classmethod
     async def from_client(cls, client: Client):
-        socket = await client.http.ws_connect()
+        socket = await client.http.ws_connect(compress=client.compress)
         ws = cls(socket, loop=client.loop)
+        if client.compress == 'zlib-stream':
+            # one decompressor per connection, the stream shares its window
+            ws._zlib = zlib.decompressobj()
 
         ws._connection = client._connection
         ws._dispatch_parsers = client._connection.parsers
+        ws._dispatcher = client._dispatcher
+        ws._codec = client.http.codec
+        ws._response_cache = client.http.response_cache
 
         await ws.poll_event()
 
@@ -151,39 +257,87 @@ class TeamlyWebSocket:
 
     async def poll_event(self):
         '''
-            Continuously polls the WebSocket connection for incoming messages.
+            Receives a single message from the WebSocket connection.
 
             Depending on the message type (text, binary, error, or close),
             it delegates the message to the appropriate handler or logs it.
-
-            This function is meant to be run in an event loop (e.g., inside a task).
         '''
 
         try:
             msg = await self.socket.receive()
-            if msg.type is aiohttp.WSMsgType.TEXT:
-                await self.received_message(msg.data)
-            elif msg.type is aiohttp.WSMsgType.BINARY:
-                await self.received_message(msg.data)
-            elif msg.type is aiohttp.WSMsgType.ERROR:
-                logger.error("Received: ", msg)
-            elif msg.type in (
-                aiohttp.WSMsgType.CLOSE,
-                aiohttp.WSMsgType.CLOSED,
-                aiohttp.WSMsgType.CLOSING
-            ):
-                logger.debug("Received: {}",msg)
+            await self._handle_frame(msg)
         except Exception as e:
             logger.error("Exception error {}",e)
 
-    async def received_message(self, msg: Any):
-        if type(msg) is bytes:
-            msg = msg.decode('utf-8')
+    async def receive_loop(self):
+        '''
+            Reads frames from the WebSocket as fast as they arrive until the
+            connection is closed.
+
+            This is meant to be run as a dedicated task, see :meth:`Client.connect`.
+        '''
+
+        dispatcher = self._dispatcher
+        async for msg in self.socket:
+            try:
+                await self._handle_frame(msg)
+            except Exception as e:
+                logger.error("Exception error {}",e)
+
+            if dispatcher.blocked:
+                await dispatcher.wait()
+
+        logger.debug("WebSocket closed with code {}", self.socket.close_code)
+
+    async def _handle_frame(self, msg: aiohttp.WSMessage):
+        if msg.type is aiohttp.WSMsgType.TEXT:
+            received = time.perf_counter()
+            await self.received_message(msg.data)
+            self.metrics.record(received)
+        elif msg.type is aiohttp.WSMsgType.BINARY:
+            received = time.perf_counter()
+            data = msg.data
+            if self._zlib is not None:
+                data = self._inflate(data)
+                if data is None:
+                    return
+            await self.received_message(data)
+            self.metrics.record(received)
+        elif msg.type is aiohttp.WSMsgType.ERROR:
+            logger.error("Received: {}", msg)
+        elif msg.type in (
+            aiohttp.WSMsgType.CLOSE,
+            aiohttp.WSMsgType.CLOSED,
+            aiohttp.WSMsgType.CLOSING
+        ):
+            logger.debug("Received: {}",msg)
+
+    def _inflate(self, data: bytes) -> Optional[bytes]:
+        # zlib-stream: a message can span several frames and is complete
+        # once the buffer ends with the sync flush suffix
+        self._buffer.extend(data)
+        if len(data) < 4 or data[-4:] != ZLIB_SUFFIX:
+            return None
+
+        msg = self._zlib.decompress(self._buffer) #type: ignore
+        self.metrics.compressed_bytes += len(self._buffer)
+        self.metrics.decompressed_bytes += len(msg)
+        del self._buffer[:]
+        return msg
 
+    async def received_message(self, msg: Any):
         if msg is None:
             return
 
-        msg = utils._to_json(msg)
+        # drop unwanted events before paying for the JSON decode
+        event = utils._peek_event(msg)
+        if event is not None and event not in self._connection.subscriptions and event != "HEARTBEAT_ACK":
+            if event not in self._dispatch_parsers:
+                logger.debug("Unknown event {}",event)
+            return
+
+        # the codecs accept bytes, there is no need to decode them first
+        msg = self._codec.loads(msg)
 
         event = msg["t"]
         data = msg["d"]
@@ -199,15 +353,18 @@ class TeamlyWebSocket:
         if event == "READY":
             interval = data["heartbeatIntervalMs"] / 1000
             self._keep_alive = KeepAliveHandler(ws=self,interval=interval)
-            await self.socket.send_json(self._keep_alive.get_payload())
+            await self.send_heartbeat(self._keep_alive.get_payload())
             self._keep_alive.start()
 
-        try:
-            func = self._dispatch_parsers[event]
-        except KeyError:
-            logger.debug("Unknown event {}",event)
-        else:
-            func(data)
+        if event not in self._connection.subscriptions:
+            if event not in self._dispatch_parsers:
+                logger.debug("Unknown event {}",event)
+            return
+
+        if self._response_cache is not None:
+            self._connection.invalidate_responses(event, data)
+
+        self._dispatch_parsers[event](data)
 
 
     async def close(self, code: int = 4000) -> None:
@@ -218,5 +375,10 @@ class TeamlyWebSocket:
         self._close_code = code
         await self.socket.close(code=code)
 
+    async def reconnect(self, code: int = 4009) -> None:
+        """Closes the socket and asks the client to open a new connection."""
+        self.should_reconnect = True
+        await self.close(code=code)
+
     async def send_heartbeat(self, data: Any):
-        await self.socket.send_json(data)
+        await self.socket.send_str(self._codec.dumps(data).decode('utf-8'))
@@ -26,19 +26,25 @@ from __future__ import annotations
 
 import asyncio
 import aiohttp
-import json
+import copy
+import random
 import time
 
+from contextvars import ContextVar
 
 
 
 
 
-from .utils import MISSING, json_or_text
-from typing import TYPE_CHECKING, Any, Dict, List, Literal, Union, Optional
+
+from .cache import ResponseCache
+from .utils import MISSING, DEFAULT_CODEC, JSONCodec, json_or_text
+from typing import TYPE_CHECKING, Any, Callable, Dict, FrozenSet, List, Literal, Mapping, Union, Optional
 from urllib.parse import quote
 from loguru import logger
 
+CompressMode = Literal['zlib-stream', 'deflate']
+
 if TYPE_CHECKING:
     from .embed import Embed
     from .attachment import Attachment
@@ -50,7 +56,8 @@ async def message_handler(
     content: Optional[str],
     embeds: Union[Embed,Optional[List[Embed]], None],
     attachment: Optional[List[Attachment]] = None,
-    replyTo: Optional[str] = None
+    replyTo: Optional[str] = None,
+    progress: Optional[Callable[[Attachment], Any]] = None
 ):
     payload = {}
 
@@ -62,14 +69,8 @@ async def message_handler(
         payload["embeds"] = [e.to_dict() for e in embeds] if type(embeds) is list else embeds.to_dict()
 
     if attachment:
-        payload["attachment"] = []
-
-        for a in attachment:
-            response = await state.http.upload_attachment(a._formdata)
-            json.loads(response)
-            url = response["url"]
-            a.url = url
-            payload["attachment"].append(a.to_dict())
+        await state.http.upload_attachments(attachment, progress=progress)
+        payload["attachment"] = [a.to_dict() for a in attachment]
 
     if replyTo:
        payload['replyTo'] = replyTo
@@ -77,6 +78,32 @@ async def message_handler(
     return payload
 
 
+# set by code that needs failed requests to raise, e.g. the bulk operations,
+# instead of getting the error payload back like every other caller
+_raise_for_status: ContextVar[bool] = ContextVar('_raise_for_status', default=False)
+
+
+class HTTPException(Exception):
+    """Raised for a failed request when the caller asked for it, see :mod:`teamly.bulk`.
+
+    Attributes
+    ----------
+    route: Route
+        The route of the request.
+    status: int
+        The HTTP status of the last attempt.
+    data: Union[Dict[str, Any], str, None]
+        The response body.
+    """
+
+    def __init__(self, route: Route, status: int, data: Any) -> None:
+        self.route: Route = route
+        self.status: int = status
+        self.data: Any = data
+        message = data.get('message') if isinstance(data, dict) else data
+        super().__init__(f"{route.method} {route.url} failed with status {status}: {message}")
+
+
 class Route:
     '''
         Represents an API route with a method and path, used to build full request URLs
@@ -107,8 +134,18 @@ class Route:
             })
         self.url: str = url
 
+        # requests to the same endpoint of the same team/channel share a bucket
+        self.template: str = path.split('?', 1)[0]
+        self.teamId: Optional[str] = params.get('teamId')
+        self.channelId: Optional[str] = params.get('channelId')
+        self.bucket: str = f"{method} {self.template}:{self.teamId}:{self.channelId}"
+
 class RateLimit:
-    """Simple rate limiter for HTTP requests."""
+    """Simple rate limiter for HTTP requests.
+
+    Starts as a local ``count`` requests per ``per`` seconds window and
+    adapts to the rate limit headers of the responses, see :meth:`update`.
+    """
 
     def __init__(self, count: int = 50, per: float = 1.0) -> None:
         self.max: int = count
@@ -139,20 +176,243 @@ class RateLimit:
                 logger.warning('HTTP client is ratelimited, waiting {} seconds', delay)
                 await asyncio.sleep(delay)
 
+    def update(self, headers: Mapping[str, str]) -> None:
+        """Adopts the limits the server reported for this bucket.
+
+        Understands ``X-RateLimit-Limit``, ``X-RateLimit-Remaining`` and
+        either ``X-RateLimit-Reset-After`` (seconds) or ``X-RateLimit-Reset``
+        (unix time). Missing headers keep the local values.
+        """
+
+        limit = headers.get('X-RateLimit-Limit')
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset_after = headers.get('X-RateLimit-Reset-After')
+        reset = headers.get('X-RateLimit-Reset')
+
+        try:
+            if limit is not None:
+                self.max = int(limit)
+            if remaining is not None:
+                self.remaining = min(int(remaining), self.max)
+            if reset_after is not None:
+                self._reset_in(float(reset_after))
+            elif reset is not None:
+                self._reset_in(float(reset) - time.time())
+        except ValueError:
+            logger.debug("Ignoring malformed rate limit headers {}", headers)
+
+    def hold(self, delay: float) -> None:
+        """Blocks the bucket for ``delay`` seconds, used after a 429."""
+        self.remaining = 0
+        self._reset_in(delay)
+
+    def _reset_in(self, delay: float) -> None:
+        # the window ends (and remaining refills) in `delay` seconds
+        self.window = time.time() + max(delay, 0.0) - self.per
+
+    @property
+    def is_idle(self) -> bool:
+        return time.time() > self.window + self.per
+
+    def __repr__(self) -> str:
+        return f"<RateLimit max={self.max} remaining={self.remaining} per={self.per}>"
+
+
+class RetryPolicy:
+    """Decides which failed requests are retried and how long to wait.
+
+    Rate limited requests (429) are always retried since the server did not
+    process them. Server errors (5xx) and connection errors are only
+    retried for idempotent methods. Waits use exponential backoff with full
+    jitter between zero and ``min(cap, base * 2 ** retry)`` seconds, where
+    ``retry`` counts the retries made so far, starting at zero.
+
+    Parameters
+    ----------
+    max_retries: int
+        Retries after the first attempt, ``0`` disables retrying.
+    base: float
+        The bound of the first wait in seconds.
+    cap: float
+        The longest wait in seconds.
+    idempotent_methods: FrozenSet[str]
+        Methods that are safe to send twice.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        *,
+        base: float = 0.5,
+        cap: float = 30.0,
+        idempotent_methods: FrozenSet[str] = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+    ) -> None:
+        self.max_retries: int = max_retries
+        self.base: float = base
+        self.cap: float = cap
+        self.idempotent_methods: FrozenSet[str] = idempotent_methods
+
+    def delay(self, retry: int) -> float:
+        return random.uniform(0, min(self.cap, self.base * 2 ** retry))
+
+
+class RetryBudget:
+    """Caps retries to a fraction of the requests being made.
+
+    Every request deposits ``ratio`` tokens and every retry withdraws one,
+    so during an outage at most ``ratio`` extra requests are sent per
+    request, plus a burst of ``minimum`` retries.
+    """
+
+    def __init__(self, ratio: float = 0.2, minimum: int = 10) -> None:
+        self.ratio: float = ratio
+        self.minimum: int = minimum
+        self.tokens: float = float(minimum)
+
+    def deposit(self) -> None:
+        self.tokens = min(self.tokens + self.ratio, float(self.minimum))
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class RequestMetrics:
+    """Counters updated on every HTTP attempt.
+
+    ``coalesced`` counts GET requests that were never sent because an
+    identical one was already in flight.
+    """
+
+    __slots__ = (
+        'attempts',
+        'retries',
+        'rate_limited',
+        'server_errors',
+        'connection_errors',
+        'budget_exhausted',
+        'coalesced'
+    )
+
+    def __init__(self) -> None:
+        self.attempts: int = 0
+        self.retries: int = 0
+        self.rate_limited: int = 0
+        self.server_errors: int = 0
+        self.connection_errors: int = 0
+        self.budget_exhausted: int = 0
+        self.coalesced: int = 0
+
+    def __repr__(self) -> str:
+        return " ".join(
+            ["<RequestMetrics"] + [f"{name}={getattr(self, name)}" for name in self.__slots__]
+        ) + ">"
+
 
 class HTTPClient:
 
-    def __init__(self,loop: asyncio.AbstractEventLoop, *, rate_limit: int = 5, per: float = 1.0) -> None:
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        *,
+        rate_limit: int = 5,
+        per: float = 1.0,
+        global_rate_limit: int = 50,
+        codec: Optional[JSONCodec] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        retry_budget: Optional[RetryBudget] = None,
+        coalesce: bool = True,
+        response_cache: Optional[ResponseCache] = None,
+        connector: Optional[aiohttp.BaseConnector] = None,
+        session: Optional[aiohttp.ClientSession] = None,
+        limit: int = 100,
+        limit_per_host: int = 20,
+        keepalive_timeout: float = 30.0,
+        dns_cache_ttl: Optional[int] = 300
+    ) -> None:
         self._session: aiohttp.ClientSession = MISSING
+        self._ws_session: aiohttp.ClientSession = MISSING
+
+        # a session or connector passed in may be shared with other clients,
+        # it is used as is and left open by close()
+        self._shared_session: Optional[aiohttp.ClientSession] = session
+        self._shared_connector: Optional[aiohttp.BaseConnector] = connector
+        self._limit: int = limit
+        self._limit_per_host: int = limit_per_host
+        self._keepalive_timeout: float = keepalive_timeout
+        self._dns_cache_ttl: Optional[int] = dns_cache_ttl
         self.token = None
         self.loop: asyncio.AbstractEventLoop = loop
-        self._ratelimiter = RateLimit(rate_limit, per)
+        self.codec: JSONCodec = codec or DEFAULT_CODEC
+
+        # every bucket starts with `rate_limit` per `per` until the server
+        # tells us better, and all of them together stay under the global limit
+        self._rate_limit: int = rate_limit
+        self._per: float = per
+        self._buckets: Dict[str, RateLimit] = {}
+        self._ratelimiter = RateLimit(global_rate_limit, 1.0)
+        self._global_over: asyncio.Event = MISSING
+
+        self.retry_policy: RetryPolicy = retry_policy or RetryPolicy()
+        self._retry_budget: RetryBudget = retry_budget or RetryBudget()
+        self.metrics: RequestMetrics = RequestMetrics()
+
+        self.coalesce: bool = coalesce
+        # key -> [task, number of callers that joined it]
+        self._inflight: Dict[Any, List[Any]] = {}
+        self.response_cache: Optional[ResponseCache] = response_cache
+
+    @property
+    def buckets(self) -> Dict[str, RateLimit]:
+        """The rate limit state of every route bucket seen so far."""
+        return dict(self._buckets)
+
+    def _get_bucket(self, route: Route) -> RateLimit:
+        try:
+            return self._buckets[route.bucket]
+        except KeyError:
+            pass
+
+        if len(self._buckets) > 1024:
+            # forget buckets that are back at their full budget
+            for key in [k for k, b in self._buckets.items() if b.is_idle]:
+                del self._buckets[key]
+
+        bucket = self._buckets[route.bucket] = RateLimit(self._rate_limit, self._per)
+        return bucket
+
+    def _create_connector(self, limit: int, limit_per_host: int) -> aiohttp.TCPConnector:
+        # aiohttp already enables TCP_NODELAY on every client connection
+        return aiohttp.TCPConnector(
+            limit=limit,
+            limit_per_host=limit_per_host,
+            keepalive_timeout=self._keepalive_timeout,
+            use_dns_cache=self._dns_cache_ttl is not None,
+            ttl_dns_cache=self._dns_cache_ttl
+        )
+
+    def _create_sessions(self) -> None:
+        if self._shared_session is not None:
+            self._session = self._shared_session
+        elif self._shared_connector is not None:
+            self._session = aiohttp.ClientSession(connector=self._shared_connector, connector_owner=False)
+        else:
+            self._session = aiohttp.ClientSession(
+                connector=self._create_connector(self._limit, self._limit_per_host)
+            )
+
+        # the gateway holds one long lived socket, keeping it on its own pool
+        # stops REST traffic from queueing behind it and the other way around
+        self._ws_session = aiohttp.ClientSession(connector=self._create_connector(2, 2))
 
     async def static_login(self, token: str):
         logger.debug("static logging...")
 
         self.token = token
-        self._session = aiohttp.ClientSession()
+        if self._session is MISSING or self._session.closed:
+            self._create_sessions()
 
         try:
             data = await self.get_loggedIn_user
@@ -163,12 +423,15 @@ class HTTPClient:
 
     async def close(self):
         logger.debug("closing client session...")
-        await self._session.close()
+        if self._ws_session is not MISSING:
+            await self._ws_session.close()
+        if self._session is not MISSING and self._session is not self._shared_session:
+            await self._session.close()
 
-    async def ws_connect(self) -> aiohttp.ClientWebSocketResponse:
+    async def ws_connect(self, compress: Optional[CompressMode] = None) -> aiohttp.ClientWebSocketResponse:
         logger.debug("creating ws connect...")
 
-        kwargs = {
+        kwargs: Dict[str, Any] = {
             "timeout": 30,
             "max_msg_size": 0,
             "headers": {
@@ -176,13 +439,58 @@ class HTTPClient:
             }
         }
 
-        return await self._session.ws_connect(url="wss://api.teamly.one/api/v1/ws", **kwargs)
+        url = "wss://api.teamly.one/api/v1/ws"
+        if compress == 'zlib-stream':
+            url += "?compress=zlib-stream"
+        elif compress == 'deflate':
+            # permessage-deflate, negotiated and inflated by aiohttp itself
+            kwargs["compress"] = 15
+
+        return await self._ws_session.ws_connect(url=url, **kwargs)
 
     async def request(self, route: Route, **kwargs) -> Any:
+        params = kwargs.get('params')
+        params = tuple(sorted(params.items())) if params else None
+
+        cache = self.response_cache
+        if cache is not None and cache.cacheable(route):
+            body = cache.get(route, params)
+            if body is not None:
+                logger.debug("Serving {!r} {} from the response cache", route.method, route.url)
+                return self.codec.loads(body)
+
+        if not self.coalesce or route.method not in ('GET', 'HEAD'):
+            return await self._request(route, **kwargs)
+
+        # concurrent reads of the same resource share a single request
+        key = (route.method, route.url, params)
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            inflight[1] += 1
+            self.metrics.coalesced += 1
+            logger.debug("Joining in-flight request {!r} {}", route.method, route.url)
+        else:
+            inflight = [self.loop.create_task(self._request(route, **kwargs)), 0]
+            self._inflight[key] = inflight
+            inflight[0].add_done_callback(
+                lambda t: self._inflight.pop(key, None) if self._inflight.get(key, [None])[0] is t else None
+            )
+
+        # a cancelled caller must not cancel the request for everyone else
+        data = await asyncio.shield(inflight[0])
+        # once it was shared every caller gets its own copy to modify
+        return copy.deepcopy(data) if inflight[1] else data
+
+    async def _request(self, route: Route, **kwargs) -> Any:
         method = route.method
         url = route.url
+        bucket = self._get_bucket(route)
+        policy = self.retry_policy
+        metrics = self.metrics
 
-        await self._ratelimiter.block()
+        if self._global_over is MISSING:
+            self._global_over = asyncio.Event()
+            self._global_over.set()
 
         #creating headers
         headers = {}
@@ -192,41 +500,118 @@ class HTTPClient:
 
         if 'json' in kwargs:
             headers["Content-Type"] = "application/json"
-            kwargs['data'] = json.dumps(kwargs.pop('json'))
+            kwargs['data'] = self.codec.dumps(kwargs.pop('json'))
 
         kwargs["headers"] = headers
 
-        data: Optional[Union[Dict[str,Any], str]] = None
-        try:
-            async with self._session.request(method, url, **kwargs) as response:
-                logger.debug("Sending request {!r} {} with {}", method, url, kwargs)
-                if response.status == 429:
-                    retry_after = response.headers.get("Retry-After")
-                    if retry_after is None:
-                        payload = await json_or_text(response)
-                        if isinstance(payload, dict) and "retry_after" in payload:
-                            retry_after = payload.get("retry_after")
-                    delay = float(retry_after or 1)
-                    logger.warning('Rate limit hit, retrying after {} seconds', delay)
-                    await asyncio.sleep(delay)
-                    return await self.request(route, **kwargs)
-
-                data = await json_or_text(response)
-
-                status = response.status
-                if 200 <= status < 300:
-                    logger.debug("Request successful with status {}", status)
-                elif 400 <= status < 500:
-                        logger.warning(f"Client error with status {status}. {data['message']}")
-                elif status >= 500:
-                    logger.error("Server error with status {}", status)
-                else:
-                    logger.debug("Received status {}", status)
-
-                return data
-        except Exception as e:
-            logger.error("Request failed: {}", e)
-            raise
+        # a FormData body is consumed by the first attempt and cannot be sent
+        # again, pass a callable that builds it instead to make it replayable
+        form_factory = kwargs.pop('data') if callable(kwargs.get('data')) else None
+        replayable = form_factory is not None or not isinstance(kwargs.get('data'), aiohttp.FormData)
+        idempotent = method in policy.idempotent_methods
+
+        self._retry_budget.deposit()
+        attempt = 0
+        status = 0
+        while True:
+            attempt += 1
+            metrics.attempts += 1
+
+            await self._global_over.wait()
+            await self._ratelimiter.block()
+            await bucket.block()
+
+            if form_factory is not None:
+                kwargs['data'] = form_factory()
+
+            data: Optional[Union[Dict[str,Any], str]] = None
+            error: Optional[BaseException] = None
+            try:
+                async with self._session.request(method, url, **kwargs) as response:
+                    logger.debug("Sending request {!r} {} (attempt {})", method, url, attempt)
+                    bucket.update(response.headers)
+                    status = response.status
+                    data = await json_or_text(response, self.codec)
+
+                    if status == 429:
+                        metrics.rate_limited += 1
+                        retry_after = response.headers.get("Retry-After")
+                        if retry_after is None and isinstance(data, dict):
+                            retry_after = data.get("retry_after")
+                        delay = float(retry_after or 1)
+
+                        is_global = response.headers.get("X-RateLimit-Global") is not None or (
+                            isinstance(data, dict) and bool(data.get("global"))
+                        )
+                        if is_global:
+                            logger.warning('Global rate limit hit, pausing all requests for {} seconds', delay)
+                            self._global_over.clear()
+                            self.loop.call_later(delay, self._global_over.set)
+                            delay = 0.0
+                        else:
+                            logger.warning('Rate limit hit on {}, retrying after {} seconds', route.bucket, delay)
+                            bucket.hold(delay)
+                            delay = 0.0
+
+                        # the server did not process the request, any method can be retried
+                        retryable = True
+                    elif status >= 500:
+                        metrics.server_errors += 1
+                        logger.error("Server error with status {}", status)
+                        retryable = idempotent
+                        delay = policy.delay(attempt - 1)
+                    else:
+                        if 200 <= status < 300:
+                            logger.debug("Request successful with status {}", status)
+                            if self.response_cache is not None:
+                                await self._cache_response(route, kwargs.get('params'), response, data)
+                        elif 400 <= status < 500:
+                            message = data.get('message') if isinstance(data, dict) else data
+                            logger.warning("Client error with status {}. {}", status, message)
+                            if _raise_for_status.get():
+                                raise HTTPException(route, status, data)
+                        else:
+                            logger.debug("Received status {}", status)
+                        return data
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                metrics.connection_errors += 1
+                logger.warning("Request {} {} failed: {!r}", method, url, e)
+                error = e
+                retryable = idempotent
+                delay = policy.delay(attempt - 1)
+            except HTTPException:
+                raise
+            except Exception as e:
+                logger.error("Request failed: {}", e)
+                raise
+
+            if not retryable or not replayable or attempt > policy.max_retries:
+                break
+            if not self._retry_budget.withdraw():
+                metrics.budget_exhausted += 1
+                logger.warning("Retry budget exhausted, giving up on {} {}", method, url)
+                break
+
+            metrics.retries += 1
+            if delay:
+                logger.debug("Retrying {} {} in {:.2f} seconds", method, url, delay)
+                await asyncio.sleep(delay)
+
+        if error is not None:
+            raise error
+        if _raise_for_status.get():
+            raise HTTPException(route, status, data)
+        return data
+
+
+    async def _cache_response(self, route: Route, params: Any, response: aiohttp.ClientResponse, data: Any) -> None:
+        cache: ResponseCache = self.response_cache #type: ignore
+        if route.method != "GET":
+            cache.invalidate_route(route)
+        elif cache.cacheable(route) and not isinstance(data, str):
+            # the body was already read, this returns it without another read
+            body = await response.read()
+            cache.set(route, tuple(sorted(params.items())) if params else None, body)
 
 
     #Core Resources
@@ -277,9 +662,9 @@ class HTTPClient:
         r = Route("DELETE","/channels/{channelId}/messages/{messageId}",messageId=messageId, channelId=channelId)
         return await self.request(r)
 
-    async def get_channel_messages(self, channelId: str, offset: str = 0, limit: str = 50):
-        r = Route("GET","/channels/{channelId}/messages" + f"?offset={offset}&limit={limit}", channelId=channelId)
-        return await self.request(r)
+    async def get_channel_messages(self, channelId: str, offset: int = 0, limit: int = 50):
+        r = Route("GET","/channels/{channelId}/messages", channelId=channelId)
+        return await self.request(r, params={"offset": offset, "limit": limit})
 
     async def update_channel_message(self, channelId: str, messageId: str, payload: Dict[str, Any]):
         r = Route("PATCH","/channels/{channelId}/messages/{messageId}", channelId=channelId, messageId=messageId)
@@ -468,10 +853,45 @@ class HTTPClient:
 
 
     #Attachments
-    async def upload_attachment(self, payload: aiohttp.FormData):
+    async def upload_attachment(self, payload: Union[aiohttp.FormData, Callable[[], aiohttp.FormData]]):
         r = Route("POST","/upload")
         return await self.request(r, data=payload)
 
+    async def upload_attachments(
+        self,
+        attachments: List[Attachment],
+        *,
+        concurrency: int = 4,
+        progress: Optional[Callable[[Attachment], Any]] = None
+    ) -> None:
+        """Uploads the attachments concurrently and sets their ``url``.
+
+        ``progress`` is called with the attachment after every chunk sent.
+        The first failed upload cancels the others and is raised.
+        """
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def upload(a: Attachment) -> None:
+            a._progress = progress
+            async with semaphore:
+                # a form factory lets the retry loop send the file again
+                form = (lambda: a._formdata) if a.replayable else a._formdata
+                response = await self.upload_attachment(form)
+            if not isinstance(response, dict) or "url" not in response:
+                raise RuntimeError(f"uploading {a.filename!r} failed: {response}")
+            a.url = response["url"]
+            logger.debug("Uploaded {} ({} bytes at {:.0f} B/s)", a.filename, a.uploaded, a.throughput)
+
+        tasks = [asyncio.ensure_future(upload(a)) for a in attachments]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
 
 
 
@@ -0,0 +1,178 @@
+'''
+MIT License
+
+Copyright (c) 2025 Fatih Kuloglu
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+'''
+
+from __future__ import annotations
+
+import asyncio
+
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, List, Optional, Set, Union
+
+from .message import Message
+
+if TYPE_CHECKING:
+    from .channel import TextChannel
+
+__all__ = ['HistoryIterator']
+
+
+def _as_datetime(value: Union[Message, datetime, str]) -> datetime:
+    if isinstance(value, Message):
+        value = value.created_at
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class HistoryIterator:
+    """Iterates over the messages of a channel, newest first.
+
+    Pages are requested with ``offset``/``limit`` and the next page is
+    already being fetched while the current one is consumed. Only the
+    current page and the one in flight are kept, so walking a long history
+    uses constant memory. The messages are not added to the cache.
+
+    Parameters
+    ----------
+    channel: TextChannel
+        The channel to read.
+    limit: Optional[int]
+        The number of messages to yield, ``None`` walks the whole history.
+    before: Optional[Union[Message, datetime]]
+        Only yield messages created before this.
+    after: Optional[Union[Message, datetime]]
+        Only yield messages created after this, iteration stops at the
+        first older message.
+    page_size: int
+        Messages requested per page.
+    offset: int
+        The position in the history to start reading at, ``0`` is the
+        newest message.
+    raw: bool
+        Yields the message payloads as the API returned them instead of
+        :class:`Message` objects.
+    """
+
+    def __init__(
+        self,
+        channel: TextChannel,
+        *,
+        limit: Optional[int] = 100,
+        before: Optional[Union[Message, datetime]] = None,
+        after: Optional[Union[Message, datetime]] = None,
+        page_size: int = 50,
+        offset: int = 0,
+        raw: bool = False
+    ) -> None:
+        self.channel: TextChannel = channel
+        self.limit: Optional[int] = limit
+        self.before: Optional[datetime] = _as_datetime(before) if before is not None else None
+        self.after: Optional[datetime] = _as_datetime(after) if after is not None else None
+        self.page_size: int = page_size if limit is None else max(1, min(page_size, limit))
+        self.raw: bool = raw
+
+        self._state = channel._state
+        self._offset: int = offset
+        self._started: bool = False
+        self._page: List[Any] = []
+        self._index: int = 0
+        self._seen: Set[str] = set()
+        self._next: Optional[asyncio.Task] = None
+        self._exhausted: bool = False
+        self._yielded: int = 0
+
+    def _prefetch(self) -> None:
+        if self._exhausted:
+            self._next = None
+            return
+
+        self._next = asyncio.ensure_future(self._state.http.get_channel_messages(
+            channelId=self.channel.id,
+            offset=self._offset,
+            limit=self.page_size
+        ))
+        self._offset += self.page_size
+
+    async def _fill(self) -> bool:
+        if self._next is None:
+            if self._started:
+                return False
+            self._started = True
+            self._prefetch()
+
+        data = await self._next #type: ignore
+        page = data['messages'] if data else []
+        if len(page) < self.page_size:
+            self._exhausted = True
+
+        # new messages shift the offsets, skip the ones the last page had
+        seen = self._seen
+        self._page = [m for m in page if m['id'] not in seen]
+        self._seen = {m['id'] for m in page}
+        self._index = 0
+
+        self._prefetch()
+        return bool(page)
+
+    def __aiter__(self) -> HistoryIterator:
+        return self
+
+    async def __anext__(self) -> Any:
+        while True:
+            if self.limit is not None and self._yielded >= self.limit:
+                self.close()
+                raise StopAsyncIteration
+
+            if self._index >= len(self._page):
+                if not await self._fill():
+                    self.close()
+                    raise StopAsyncIteration
+                continue
+
+            data = self._page[self._index]
+            self._index += 1
+
+            if self.before is not None or self.after is not None:
+                created_at = _as_datetime(data['createdAt'])
+                if self.before is not None and created_at >= self.before:
+                    continue
+                if self.after is not None and created_at <= self.after:
+                    self.close()
+                    raise StopAsyncIteration
+
+            self._yielded += 1
+            return data if self.raw else Message(state=self._state, data=data)
+
+    async def flatten(self) -> List[Message]:
+        return [message async for message in self]
+
+    def close(self) -> None:
+        """Stops the iteration and cancels the page being prefetched."""
+        self._exhausted = True
+        if self._next is not None and not self._next.done():
+            self._next.cancel()
+        self._next = None
+        self._page = []
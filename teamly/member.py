@@ -25,9 +25,11 @@ SOFTWARE.
 from __future__ import annotations
 
 from .types.member import Member as MemberPayload
-from typing import TYPE_CHECKING, List
+from typing import TYPE_CHECKING, Any, List, Optional
 
 if TYPE_CHECKING:
+    from .category import Category
+    from .permissions import ResolvedPermissions
     from .state import ConnectionState
 
 
@@ -35,6 +37,9 @@ class Member:
 
     def __init__(self, state: ConnectionState, data: MemberPayload) -> None:
         self._state: ConnectionState = state
+        self._update(data)
+
+    def _update(self, data: MemberPayload) -> None:
         self.id: str = data['id']
         self.username: str = data['username']
         self.permissions: str = data['permissions']
@@ -50,5 +55,9 @@ class Member:
             "joinedAt": self.joined_at
         }
 
+    def permissions_in(self, channel: Any, *, category: Optional[Category] = None) -> ResolvedPermissions:
+        """Returns the effective permissions of the member in ``channel``, see :class:`PermissionResolver`."""
+        return self._state.permissions.resolve(self, channel, category=category)
+
     def __repr__(self) -> str:
         return f"<Member id={self.id} username={self.username!r} joinedAt={self.joined_at}>"
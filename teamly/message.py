@@ -34,8 +34,29 @@ if TYPE_CHECKING:
 
 class Message:
 
+    __slots__ = (
+        '_state',
+        'id',
+        'channel_id',
+        'type',
+        'content',
+        'attachments',
+        'created_by',
+        'edited_at',
+        'reply_to',
+        'embeds',
+        'emojis',
+        'reactions',
+        'nonce',
+        'created_at',
+        'mentions'
+    )
+
     def __init__(self, state: ConnectionState, data: MessagePayload) -> None:
         self._state: ConnectionState = state
+        self._update(data)
+
+    def _update(self, data: MessagePayload) -> None:
         self.id: str = data['id']
         self.channel_id: str = data['channelId']
         self.type: str = data['type']
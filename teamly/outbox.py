@@ -0,0 +1,269 @@
+'''
+MIT License
+
+Copyright (c) 2025 Fatih Kuloglu
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+'''
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+from collections import deque
+from enum import IntEnum
+from typing import TYPE_CHECKING, Any, Deque, Dict, List, Optional, Union
+from loguru import logger
+
+from .http import _raise_for_status
+
+if TYPE_CHECKING:
+    from .embed import Embed
+    from .http import HTTPClient
+
+__all__ = (
+    'Priority',
+    'OutboxStats',
+    'Outbox',
+)
+
+
+class Priority(IntEnum):
+    """Lanes of the :class:`Outbox`, lower values are sent first."""
+
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+
+class OutboxStats:
+    """Counters of an :class:`Outbox`.
+
+    ``latency`` is measured from :meth:`Outbox.send` until the message was
+    accepted by the API.
+    """
+
+    __slots__ = ('sent', 'requests', 'merged', 'failed', 'latency', 'max_latency', '_total_latency')
+
+    def __init__(self) -> None:
+        self.sent: int = 0
+        self.requests: int = 0
+        self.merged: int = 0
+        self.failed: int = 0
+        self.latency: float = 0.0
+        self.max_latency: float = 0.0
+        self._total_latency: float = 0.0
+
+    @property
+    def average_latency(self) -> float:
+        return self._total_latency / self.sent if self.sent else 0.0
+
+    def _record(self, latency: float) -> None:
+        self.sent += 1
+        self.latency = latency
+        self._total_latency += latency
+        if latency > self.max_latency:
+            self.max_latency = latency
+
+    def __repr__(self) -> str:
+        return (
+            f"<OutboxStats sent={self.sent} requests={self.requests} merged={self.merged} "
+            f"failed={self.failed} averageLatency={self.average_latency:.3f} maxLatency={self.max_latency:.3f}>"
+        )
+
+
+class _Item:
+    __slots__ = ('payload', 'future', 'queued_at')
+
+    def __init__(self, payload: Dict[str, Any], future: asyncio.Future) -> None:
+        self.payload: Dict[str, Any] = payload
+        self.future: asyncio.Future = future
+        self.queued_at: float = time.perf_counter()
+
+    @property
+    def mergeable(self) -> bool:
+        return len(self.payload) == 1
+
+
+class Outbox:
+    """Queues outgoing messages and sends them one channel at a time.
+
+    Messages to the same channel are sent in order, one after the other,
+    while different channels are served concurrently. Every channel has a
+    lane per :class:`Priority` and higher lanes are emptied first, so a
+    reply can overtake queued bulk notifications.
+
+    With ``coalesce`` enabled consecutive plain text messages of the same
+    lane are joined with ``separator`` into one message, as long as it stays
+    within ``max_length`` characters.
+
+    Parameters
+    ----------
+    http: HTTPClient
+        The client used to send the messages.
+    coalesce: bool
+        Merges queued plain text messages.
+    max_length: int
+        The length limit of a message.
+    separator: str
+        Put between merged messages.
+    """
+
+    def __init__(
+        self,
+        http: HTTPClient,
+        *,
+        coalesce: bool = False,
+        max_length: int = 2000,
+        separator: str = "\n"
+    ) -> None:
+        self.http: HTTPClient = http
+        self.coalesce: bool = coalesce
+        self.max_length: int = max_length
+        self.separator: str = separator
+        self.stats: OutboxStats = OutboxStats()
+
+        self._queues: Dict[str, List[Deque[_Item]]] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._closed: bool = False
+
+    @property
+    def depth(self) -> int:
+        """The number of messages waiting in every channel."""
+        return sum(len(lane) for lanes in self._queues.values() for lane in lanes)
+
+    def channel_depth(self, channelId: str) -> int:
+        lanes = self._queues.get(channelId)
+        return sum(len(lane) for lane in lanes) if lanes else 0
+
+    def send(
+        self,
+        channelId: str,
+        content: Optional[str] = None,
+        *,
+        embeds: Union[Embed, List[Embed], None] = None,
+        replyTo: Optional[str] = None,
+        priority: Priority = Priority.NORMAL
+    ) -> asyncio.Future:
+        """Queues a message.
+
+        Returns a future with the response of the request that sent it,
+        await it to wait for the delivery. A rejected message raises
+        :exc:`HTTPException` from the future.
+        """
+
+        if self._closed:
+            raise RuntimeError("the outbox is closed")
+        if content is not None and len(content) > self.max_length:
+            raise ValueError(f"the content must equel or lower then {self.max_length} characters")
+
+        payload: Dict[str, Any] = {"content": content}
+        if embeds:
+            payload["embeds"] = [e.to_dict() for e in embeds] if isinstance(embeds, list) else [embeds.to_dict()]
+        if replyTo:
+            payload["replyTo"] = replyTo
+
+        future = asyncio.get_running_loop().create_future()
+        lanes = self._queues.get(channelId)
+        if lanes is None:
+            lanes = self._queues[channelId] = [deque() for _ in Priority]
+        lanes[priority].append(_Item(payload, future))
+
+        if channelId not in self._workers:
+            self._workers[channelId] = asyncio.create_task(self._worker(channelId), name=f"Teamly.py: outbox {channelId}")
+        return future
+
+    def _next_batch(self, lanes: List[Deque[_Item]]) -> Optional[List[_Item]]:
+        for lane in lanes:
+            if not lane:
+                continue
+
+            batch = [lane.popleft()]
+            if self.coalesce and batch[0].mergeable and batch[0].payload["content"]:
+                length = len(batch[0].payload["content"])
+                while lane and lane[0].mergeable and lane[0].payload["content"]:
+                    extra = len(self.separator) + len(lane[0].payload["content"])
+                    if length + extra > self.max_length:
+                        break
+                    length += extra
+                    batch.append(lane.popleft())
+            return batch
+        return None
+
+    async def _worker(self, channelId: str) -> None:
+        # the worker runs in its own context, error responses raise here only
+        _raise_for_status.set(True)
+        lanes = self._queues[channelId]
+        try:
+            while True:
+                batch = self._next_batch(lanes)
+                if batch is None:
+                    return
+
+                if len(batch) > 1:
+                    payload = {"content": self.separator.join(item.payload["content"] for item in batch)}
+                    self.stats.merged += len(batch) - 1
+                else:
+                    payload = batch[0].payload
+
+                self.stats.requests += 1
+                try:
+                    response = await self.http.create_message(channelId=channelId, payload=payload)
+                except asyncio.CancelledError:
+                    for item in batch:
+                        item.future.cancel()
+                    raise
+                except Exception as e:
+                    logger.error("Outbox failed to send to channel {}: {}", channelId, e)
+                    self.stats.failed += len(batch)
+                    for item in batch:
+                        if not item.future.done():
+                            item.future.set_exception(e)
+                    continue
+
+                now = time.perf_counter()
+                for item in batch:
+                    self.stats._record(now - item.queued_at)
+                    if not item.future.done():
+                        item.future.set_result(response)
+        finally:
+            del self._workers[channelId]
+            if not any(lanes):
+                self._queues.pop(channelId, None)
+
+    async def flush(self) -> None:
+        """Waits until every queued message was sent."""
+        while self._workers:
+            await asyncio.gather(*self._workers.values(), return_exceptions=True)
+
+    async def close(self, *, flush: bool = True) -> None:
+        """Stops accepting messages, sending or dropping the queued ones."""
+        self._closed = True
+        if flush:
+            await self.flush()
+            return
+
+        for task in list(self._workers.values()):
+            task.cancel()
+        for lanes in self._queues.values():
+            for lane in lanes:
+                for item in lane:
+                    item.future.cancel()
+        self._queues.clear()
@@ -24,10 +24,33 @@ SOFTWARE.
 
 from __future__ import annotations
 
-from typing import Optional, Self
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, ClassVar, Dict, FrozenSet, Iterator, Optional, Self, Tuple, Union
+
+from .cache import LRUCache
+
+if TYPE_CHECKING:
+    from .category import Category
+    from .member import Member
+    from .state import ConnectionState
+
+
+def _flags(names: Tuple[str, ...], **moved: int) -> Dict[str, int]:
+    flags = {name: 1 << i for i, name in enumerate(names)}
+    for name, bit in moved.items():
+        flags[name] = 1 << bit
+    return flags
+
+
+@lru_cache(maxsize=256)
+def _enabled(flags: Tuple[Tuple[str, int], ...], value: int) -> Tuple[str, ...]:
+    return tuple(name for name, bit in flags if value & bit)
+
 
 class Permissions:
 
+    __slots__ = ('value',)
+
     VALUES = (
         'administrator',
         'manage_channels',
@@ -45,15 +68,14 @@ class Permissions:
         'move_members'
     )
 
+    # name -> bit, built once so a check is a dict hit and an AND
+    FLAGS: ClassVar[Dict[str, int]] = _flags(VALUES)
+    ALL: ClassVar[int] = sum(FLAGS.values())
+
     def __init__(self, value: int = 0, **kwargs: Optional[bool]) -> None:
         self.value: int = value
-
-        for k,v in kwargs.items():
-            if k not in self.VALUES:
-                raise ValueError(f"Unknown permission: '{k}'")
-            if v is True:
-                i = self.VALUES.index(k)
-                self.value |= (1 << i)
+        if kwargs:
+            self.define(**kwargs)
 
     @classmethod
     def none(cls) -> int:
@@ -61,7 +83,7 @@ class Permissions:
 
     @classmethod
     def all(cls) -> Self:
-        return cls(0b0000_0011_1111_1111_1111)
+        return cls(cls.ALL)
 
     @property
     def administrator(self) -> int:
@@ -119,35 +141,80 @@ class Permissions:
     def move_members(self):
         return 1 << 13
 
+    @classmethod
+    def _bits(cls, other: Union[Permissions, int, str]) -> int:
+        if isinstance(other, Permissions):
+            return other.value
+        if isinstance(other, str):
+            try:
+                return cls.FLAGS[other]
+            except KeyError:
+                raise ValueError(f"Unknown permission: '{other}'") from None
+        return other
+
     def has(self, name: str) -> bool:
         try:
-            index = self.VALUES.index(name)
-        except ValueError:
-            raise ValueError(f"Unknown permission: {name}")
-        return bool(self.value & (1 << index))
+            return bool(self.value & self.FLAGS[name])
+        except KeyError:
+            raise ValueError(f"Unknown permission: {name}") from None
+
+    def define(self, **kwargs: Optional[bool]) -> Self:
+        """Sets the permissions passed as ``True`` and clears the ones passed as ``False``."""
+        flags = self.FLAGS
+        for key, bit in kwargs.items():
+            try:
+                flag = flags[key]
+            except KeyError:
+                raise ValueError(f"Unknown permission: '{key}'") from None
+            if bit is True:
+                self.value |= flag
+            elif bit is False:
+                self.value &= ~flag
 
+        return self
 
-    def define(self, **kwargs: Optional[bool]):
-        for key in kwargs:
-            if key not in self.VALUES:
-                raise ValueError(f"'{key}' is not a valid permission for this channel type")
+    def __contains__(self, name: str) -> bool:
+        return self.has(name)
 
-        for i, name in enumerate(self.VALUES):
-            bit = kwargs.get(name)
-            if bit is True:
-                self.allow |= (1 << i)
-            if bit is False:
-                self.deny |= (1 << i)
+    def __or__(self, other: Union[Permissions, int, str]) -> Permissions:
+        return self.__class__(self.value | self._bits(other))
 
-        return self
+    def __and__(self, other: Union[Permissions, int, str]) -> Permissions:
+        return self.__class__(self.value & self._bits(other))
+
+    def __sub__(self, other: Union[Permissions, int, str]) -> Permissions:
+        return self.__class__(self.value & ~self._bits(other))
+
+    __ror__ = __or__
+    __rand__ = __and__
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Permissions):
+            return self.value == other.value
+        if isinstance(other, int):
+            return self.value == other
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self.value)
+
+    def __int__(self) -> int:
+        return self.value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(_enabled(_TEAM_ITEMS, self.value))
 
     def __repr__(self) -> str:
-        enabled = [name for i, name in enumerate(self.VALUES) if self.value & (1 << i)]
-        return f"<Permissions value={self.value} enabled={enabled}>"
+        return f"<Permissions value={self.value} enabled={list(_enabled(_TEAM_ITEMS, self.value))}>"
+
 
+_TEAM_ITEMS: Tuple[Tuple[str, int], ...] = tuple(Permissions.FLAGS.items())
 
 
 class PermissionsOverwrite:
+
+    __slots__ = ('_type', 'allow', 'deny')
+
     TEXT = (
         'view_channel',
         'manage_messages',
@@ -189,110 +256,60 @@ class PermissionsOverwrite:
         'delete_announcements'
     )
 
+    # channel type -> name -> bit
+    FLAGS: ClassVar[Dict[str, Dict[str, int]]] = {
+        "text": _flags(TEXT),
+        # disconnect is sent as bit 12
+        "voice": _flags(VOICE, disconnect=12),
+        "todo": _flags(TODO),
+        "watchstream": _flags(WATCHSTREAM),
+        "announcement": _flags(ANNOUNCEMENT),
+    }
+
     def __init__(self) -> None:
         raise RuntimeError(
             "Use PermissionsOverwrite.text(), .voice(), etc. — do not instantiate directly."
         )
 
     @classmethod
-    def text(cls, **kwargs: bool) -> Self:
+    def _build(cls, type: str, kwargs: Dict[str, Optional[bool]]) -> Self:
         self = cls.__new__(cls)
-        self._type = "text"
+        self._type = type
         self.allow = Permissions.none()
         self.deny = Permissions.none()
 
-        for key in kwargs:
-            if key not in cls.TEXT:
-                raise ValueError(f"'{key}' is not a valid permission for this channel type")
-
-        for i, name in enumerate(cls.TEXT):
-            bit = kwargs.get(name)
+        flags = cls.FLAGS[type]
+        for key, bit in kwargs.items():
+            try:
+                flag = flags[key]
+            except KeyError:
+                raise ValueError(f"'{key}' is not a valid permission for this channel type") from None
             if bit is True:
-                self.allow |= (1 << i)
-            if bit is False:
-                self.deny |= (1 << i)
+                self.allow |= flag
+            elif bit is False:
+                self.deny |= flag
 
         return self
 
     @classmethod
-    def voice(cls, **kwargs: Optional[bool]) -> Self:
-        self = cls.__new__(cls)
-        self._type = "voice"
-        self.allow = Permissions.none()
-        self.deny = Permissions.none()
+    def text(cls, **kwargs: Optional[bool]) -> Self:
+        return cls._build("text", kwargs)
 
-        for key in kwargs:
-            if key not in cls.VOICE:
-                raise ValueError(f"'{key}' is not a valid permission for this channel type")
-
-        for i, name in enumerate(cls.VOICE):
-            bit = kwargs.get(name)
-            if bit is True:
-                self.allow |= (1 << i)
-            if bit is False:
-                self.deny |= (1 << i)
-
-        return self
+    @classmethod
+    def voice(cls, **kwargs: Optional[bool]) -> Self:
+        return cls._build("voice", kwargs)
 
     @classmethod
     def todo(cls, **kwargs: Optional[bool]) -> Self:
-        self = cls.__new__(cls)
-        self._type = "todo"
-        self.allow = Permissions.none()
-        self.deny = Permissions.none()
-
-        for key in kwargs:
-            if key not in cls.TODO:
-                raise ValueError(f"'{key}' is not a valid permission for this channel type")
-
-        for i, name in enumerate(cls.TODO):
-            bit = kwargs.get(name)
-            if bit is True:
-                self.allow |= (1 << i)
-            if bit is False:
-                self.deny |= (1 << i)
-
-        return self
+        return cls._build("todo", kwargs)
 
     @classmethod
     def watchstream(cls, **kwargs: Optional[bool]) -> Self:
-        self = cls.__new__(cls)
-        self._type = "watchstream"
-        self.allow = Permissions.none()
-        self.deny = Permissions.none()
-
-        for key in kwargs:
-            if key not in cls.WATCHSTREAM:
-                raise ValueError(f"'{key}' is not a valid permission for this channel type")
-
-        for i, name in enumerate(cls.WATCHSTREAM):
-            bit = kwargs.get(name)
-            if bit is True:
-                self.allow |= (1 << i)
-            if bit is False:
-                self.deny |= (1 << i)
-
-        return self
+        return cls._build("watchstream", kwargs)
 
     @classmethod
-    def announcement(cls, **kwargs: Optional[bool]):
-        self = cls.__new__(cls)
-        self._type = "announcement"
-        self.allow = Permissions.none()
-        self.deny = Permissions.none()
-
-        for key in kwargs:
-            if key not in cls.ANNOUNCEMENT:
-                raise ValueError(f"'{key}' is not a valid permission for this channel type")
-
-        for i, name in enumerate(cls.ANNOUNCEMENT):
-            bit = kwargs.get(name)
-            if bit is True:
-                self.allow |= (1 << i)
-            if bit is False:
-                self.deny |= (1 << i)
-
-        return self
+    def announcement(cls, **kwargs: Optional[bool]) -> Self:
+        return cls._build("announcement", kwargs)
 
 
     def has(self, name: str) -> Optional[bool]:
@@ -311,33 +328,147 @@ class PermissionsOverwrite:
             overwrite.
         """
 
-        type_map = {
-            "text": self.TEXT,
-            "voice": self.VOICE,
-            "todo": self.TODO,
-            "watchstream": self.WATCHSTREAM,
-            "announcement": self.ANNOUNCEMENT,
-        }
-
-        if not hasattr(self, "_type"):
-            raise RuntimeError("PermissionsOverwrite not initialised correctly")
-
-        valid = type_map.get(self.__type)
-        if valid is None or name not in valid:
-            raise ValueError(f"'{name}' is not a valid permission for this channel type")
-
-        index = valid.index(name)
-        if self.__type == "voice" and index == 7:
-            index = 12
-
-        allowed = bool(self.allow & (1 << index))
-        denied = bool(self.deny & (1 << index))
+        try:
+            flag = self.FLAGS[self._type][name]
+        except AttributeError:
+            raise RuntimeError("PermissionsOverwrite not initialised correctly") from None
+        except KeyError:
+            raise ValueError(f"'{name}' is not a valid permission for this channel type") from None
 
-        if allowed:
+        if self.allow & flag:
             return True
-        if denied:
+        if self.deny & flag:
             return False
         return None
 
     def to_dict(self):
         return {"allow": self.allow,"deny": self.deny}
+
+
+_OVERWRITE_FLAGS: Dict[str, Dict[str, int]] = PermissionsOverwrite.FLAGS
+_TEAM_FLAGS: Dict[str, int] = Permissions.FLAGS
+_ALL_TEAM: int = Permissions.ALL
+_ADMINISTRATOR: int = _TEAM_FLAGS['administrator']
+_ALL_CHANNEL: Dict[str, int] = {type: sum(flags.values()) for type, flags in _OVERWRITE_FLAGS.items()}
+
+
+def _all_channel(type: str) -> int:
+    return _ALL_CHANNEL.get(type, 0)
+
+
+class ResolvedPermissions:
+    """What a member can do in a channel.
+
+    Attributes
+    ----------
+    team: int
+        The team wide bits, see :class:`Permissions`.
+    channel: int
+        The channel bits after the overwrites, see :class:`PermissionsOverwrite`.
+    channel_type: str
+        The type the ``channel`` bits belong to.
+    """
+
+    __slots__ = ('team', 'channel', 'channel_type')
+
+    def __init__(self, team: int, channel: int, channel_type: str) -> None:
+        self.team: int = team
+        self.channel: int = channel
+        self.channel_type: str = channel_type
+
+    @property
+    def administrator(self) -> bool:
+        return bool(self.team & _ADMINISTRATOR)
+
+    def has(self, name: str) -> bool:
+        """Checks a team permission or a permission of the channel type."""
+        flags = _OVERWRITE_FLAGS.get(self.channel_type, {})
+        if name in flags:
+            return bool(self.channel & flags[name])
+        if name in _TEAM_FLAGS:
+            return bool(self.team & (_TEAM_FLAGS[name] | _ADMINISTRATOR))
+        raise ValueError(f"Unknown permission: '{name}'")
+
+    def __repr__(self) -> str:
+        return f"<ResolvedPermissions team={self.team} channel={self.channel} channelType={self.channel_type}>"
+
+
+class PermissionResolver:
+    """Computes and memoizes the effective permissions of members in channels.
+
+    The team bits are the union of the member roles. Category overwrites
+    and then channel overwrites are applied on top of a channel where
+    everything is allowed, role by role in ascending priority so the
+    highest role decides a conflict. Administrators and the creator of
+    the team have every permission.
+
+    Roles are read from the cache, load them first with
+    :meth:`Team.fetch_roles`. A member with a role that isn't cached can't
+    be resolved, :exc:`LookupError` is raised and nothing is memoized. The
+    same goes for a channel in a category when the category isn't passed.
+    Results are keyed by the set of role ids and the channel, members with
+    the same roles share them. They are invalidated by role, channel and
+    category events and whenever roles are stored in the cache.
+    """
+
+    def __init__(self, state: ConnectionState, *, max_size: int = 4096) -> None:
+        self._state: ConnectionState = state
+        # (teamId, channelId, categoryId, roleIds) -> ResolvedPermissions
+        self._cache: LRUCache[Tuple[str, str, Optional[str], FrozenSet[str]], ResolvedPermissions] = LRUCache(max_size)
+
+    def resolve(self, member: Member, channel: Any, *, category: Optional[Category] = None) -> ResolvedPermissions:
+        team = self._state.get_team(channel.team_id)
+        if team is not None and team.created_by == member.id:
+            return ResolvedPermissions(_ALL_TEAM, _all_channel(channel.type), channel.type)
+
+        parentId = getattr(channel, 'parent_id', None)
+        if category is None and parentId is not None:
+            # categories aren't cached, skipping its overwrites would guess
+            raise LookupError(f"Channel '{channel.id}' is in category '{parentId}', pass the category to resolve it")
+        if category is not None and category.id != parentId:
+            raise ValueError(f"Category '{category.id}' is not the parent of channel '{channel.id}'")
+
+        key = (channel.team_id, channel.id, parentId, frozenset(member.roles))
+        resolved = self._cache.get(key)
+        if resolved is None:
+            resolved = self._compute(key[3], channel, category)
+            self._cache.set(key, resolved)
+        return resolved
+
+    def _compute(self, roleIds: FrozenSet[str], channel: Any, category: Optional[Category]) -> ResolvedPermissions:
+        roles = []
+        for roleId in roleIds:
+            role = self._state.get_role(roleId)
+            if role is None:
+                # an unknown role may deny anything, guessing would allow it
+                raise LookupError(f"Role '{roleId}' is not cached, load the roles with Team.fetch_roles() first")
+            roles.append(role)
+        roles.sort(key=lambda role: role._priority)
+
+        team = 0
+        for role in roles:
+            team |= role.permissions
+        value = _all_channel(channel.type)
+        if team & _ADMINISTRATOR:
+            return ResolvedPermissions(team, value, channel.type)
+
+        for overwrites in (category.permissions if category else None, channel.permissions):
+            overwrites = (overwrites or {}).get('role', overwrites) or {}
+            for role in roles:
+                entry = overwrites.get(role.id)
+                if entry:
+                    value = (value & ~entry.get('deny', 0)) | entry.get('allow', 0)
+        return ResolvedPermissions(team, value, channel.type)
+
+    def invalidate(self, *, teamId: Optional[str] = None, channelId: Optional[str] = None) -> None:
+        """Drops the results of a team or a channel, everything without arguments."""
+        if teamId is None and channelId is None:
+            self._cache.clear()
+            return
+
+        for key in self._cache:
+            if (teamId is None or key[0] == teamId) and (channelId is None or key[1] == channelId):
+                self._cache.pop(key)
+
+    def __len__(self) -> int:
+        return len(self._cache)
@@ -64,7 +64,9 @@ class Role:
     ) -> None:
         self._state: ConnectionState = state
         self.team: Team = team
+        self._update(data)
 
+    def _update(self, data: RolePayload) -> None:
         self.id: str = data['id']
         self.name: str = data['name']
 
@@ -119,10 +121,10 @@ class Role:
             "color2": self.color2,
             "permissions": self.permissions,
             "priority": self._priority,
-            "createAt": self._created_at,
+            "createdAt": self._created_at,
             "updatedAt": self._updated_at,
             "isDisplayedSeparately": self.is_displayed_separately,
-            "isSelfAssigneable": self.is_self_assignable,
+            "isSelfAssignable": self.is_self_assignable,
             "iconEmojiId": self._icon_emoji_id,
             "mentionable": self.mentionable,
             "botScope": self._bot_scope
@@ -23,20 +23,23 @@ SOFTWARE.
 '''
 
 import asyncio
+import copy
 import inspect
 import json
+import time
 
 from loguru import logger
 
 from teamly.types import channel
 
 
+from .cache import CacheSnapshot, EntityCache
 from .reaction import Reaction
-from .user import ClientUser
+from .user import ClientUser, User
 from .team import Team
 from .role import Role
 from .announcement import Announcement
-from .application import ApplicationSubmission
+from .application import Application
 from .member import Member
 from .message import Message
 from .todo import TodoItem
@@ -44,15 +47,114 @@ from .channel import _channel_factory
 from .category import Category
 from .blog import Blog
 from .http import HTTPClient
-
-from typing import Dict, Callable, Any, Optional
+from .permissions import PermissionResolver
+
+from typing import Dict, Callable, Any, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+
+# gateway event -> events it dispatches to listeners. Gateway events missing
+# here are always parsed.
+EVENT_LISTENERS: Dict[str, Tuple[str, ...]] = {
+    'READY': ('ready', 'resumed', 'cache_ready'),
+    'CHANNEL_CREATED': ('channel',),
+    'CHANNEL_UPDATED': ('channel_updated',),
+    'CHANNEL_DELETED': ('channel_deleted',),
+    'MESSAGE_SEND': ('message',),
+    'MESSAGE_UPDATED': ('message_updated',),
+    'MESSAGE_DELETED': ('message_deleted',),
+    'MESSAGE_REACTION_ADDED': ('message_reaction',),
+    'MESSAGE_REACTION_REMOVED': ('message_reaction_removed',),
+    'PRESENCE_UPDATE': ('presence_updated',),
+    'TEAM_ROLE_CREATED': ('team_role',),
+    'TEAM_ROLE_DELETED': ('team_role_deleted',),
+    'TEAM_ROLES_UPDATED': ('team_roles_updated',),
+    'TEAM_UPDATED': ('team_updated',),
+    'TODO_ITEM_CREATED': ('todo_item',),
+    'TODO_ITEM_UPDATED': ('todo_item_updated',),
+    'TODO_ITEM_DELETED': ('todo_item_deleted',),
+    'USER_JOINED_TEAM': ('user_joined_team',),
+    'USER_LEFT_TEAM': ('user_left_team',),
+    'USER_JOINED_VOICE_CHANNEL': ('user_joinded_voice_channel',),
+    'USER_LEFT_VOICE_CHANNEL': ('user_left_voice_channel',),
+    'USER_PROFILE_UPDATED': ('user_profile_updated',),
+    'USER_ROLE_ADDED': ('user_role_added',),
+    'USER_ROLE_REMOVED': ('user_role_removed',),
+    'USER_UPDATED_VOICE_METADATA': ('user_updated_voice_metadata',),
+    'BLOG_CREATED': ('blog',),
+    'BLOG_DELETED': ('blog_deleted',),
+    'CATEGORIES_PRIORITY_UPDATED': ('categories_priority_updated',),
+    'CATEGORY_UPDATED': ('category_updated',),
+    'CATEGORY_DELETED': ('category_deleted',),
+    'CATEGORY_CREATED': ('category',),
+    'CHANNELS_PRIORITY_UPDATED': ('channels_priority_updated',),
+    'ANNOUNCEMENT_CREATED': ('announcement',),
+    'ANNOUNCEMENT_DELETED': ('announcement_deleted',),
+    'APPLICATION_CREATED': ('application',),
+    'APPLICATION_UPDATED': ('application_updated',),
+    'VOICE_CHANNEL_MOVE': ('voice_channel_move',),
+}
+
+
+# gateway events that keep the entity cache fresh
+CACHE_EVENTS: Tuple[str, ...] = (
+    'CHANNEL_CREATED',
+    'CHANNEL_UPDATED',
+    'CHANNEL_DELETED',
+    'TEAM_ROLE_CREATED',
+    'TEAM_ROLE_DELETED',
+    'TEAM_ROLES_UPDATED',
+    'TEAM_UPDATED',
+    'USER_LEFT_TEAM',
+    'USER_ROLE_ADDED',
+    'USER_ROLE_REMOVED',
+    'USER_PROFILE_UPDATED',
+    'CATEGORY_UPDATED',
+    'CATEGORY_DELETED',
+)
+
+MESSAGE_CACHE_EVENTS: Tuple[str, ...] = (
+    'MESSAGE_SEND',
+    'MESSAGE_UPDATED',
+    'MESSAGE_DELETED',
+)
+
+# gateway events that make cached HTTP responses stale, see ResponseCache
+RESPONSE_CACHE_EVENTS: Dict[str, Tuple[str, ...]] = {
+    'TEAM_UPDATED': ('/teams/{teamId}/details',),
+    'TEAM_ROLE_CREATED': ('/teams/{teamId}/roles',),
+    'TEAM_ROLE_DELETED': ('/teams/{teamId}/roles',),
+    'TEAM_ROLES_UPDATED': ('/teams/{teamId}/roles',),
+    'BLOG_CREATED': ('/teams/{teamId}/blogs',),
+    'BLOG_DELETED': ('/teams/{teamId}/blogs',),
+    'ANNOUNCEMENT_CREATED': ('/channels/{channelId}/announcements',),
+    'ANNOUNCEMENT_DELETED': ('/channels/{channelId}/announcements',),
+    'APPLICATION_CREATED': ('/teams/{teamId}/applications',),
+    'APPLICATION_UPDATED': ('/teams/{teamId}/applications',),
+}
 
 
 class ConnectionState:
 
-    def __init__(self, dispatch: Callable[...,Any],http: HTTPClient) -> None:
+    def __init__(
+        self,
+        dispatch: Callable[...,Any],
+        http: HTTPClient,
+        *,
+        cache_size: int = 1000,
+        max_messages: int = 0,
+        cache_ttl: Optional[float] = None,
+        warm_cache: bool = False,
+        warm_teams: Optional[List[str]] = None
+    ) -> None:
         self.http: HTTPClient = http
         self.dispatch: Callable[...,Any] = dispatch
+        self.cache: EntityCache = EntityCache(cache_size, max_messages=max_messages, ttl=cache_ttl)
+        self.permissions: PermissionResolver = PermissionResolver(self)
+        self.warm_cache: bool = warm_cache
+        self.warm_teams: List[str] = warm_teams or []
+        self.warmup_duration: Optional[float] = None
+        self._warmup_task: Optional[asyncio.Task] = None
+        self._snapshot_teams: List[str] = []
 
         self.parsers: Dict[str, Callable[[Any], None]]
         self.parsers = parsers = {}
@@ -60,17 +162,263 @@ class ConnectionState:
             if attr.startswith('parse_'):
                 parsers[attr[6:].upper()] = func
 
+        # gateway events parsed even without listeners because the state
+        # itself depends on them
+        self._consumers: Set[str] = {'READY'}
+        if self.cache.enabled:
+            self._consumers.update(CACHE_EVENTS)
+        if self.cache.messages.max_size > 0:
+            self._consumers.update(MESSAGE_CACHE_EVENTS)
+        if http.response_cache is not None:
+            self._consumers.update(RESPONSE_CACHE_EVENTS)
+        self.subscriptions: FrozenSet[str] = frozenset()
+        self.update_subscriptions(())
+
         self.clear()
 
+    def update_subscriptions(self, listeners: Iterable[str]) -> None:
+        """Rebuilds the set of gateway events that have to be parsed.
+
+        Parameters
+        ----------
+        listeners: Iterable[str]
+            Names of the events that currently have listeners.
+        """
+
+        listening = set(listeners)
+        self.subscriptions = frozenset(
+            event for event in self.parsers
+            if event in self._consumers
+            or event not in EVENT_LISTENERS
+            or not listening.isdisjoint(EVENT_LISTENERS[event])
+        )
+
     def clear(self):
         self._user: Optional[ClientUser] = None
 
+    def invalidate_responses(self, event: str, data: Any) -> None:
+        cache = self.http.response_cache
+        templates = RESPONSE_CACHE_EVENTS.get(event)
+        if cache is None or templates is None or not isinstance(data, dict):
+            return
+
+        teamId = data.get('teamId')
+        channelId = data.get('channelId')
+        if teamId is None and channelId is None:
+            # the ids may be nested in the entity, e.g. {"team": {"id": ...}}
+            for value in data.values():
+                if isinstance(value, dict):
+                    teamId = value.get('teamId') or (value.get('id') if event == 'TEAM_UPDATED' else None)
+                    channelId = value.get('channelId')
+                    break
+
+        # without an id every entry of the template is dropped
+        for template in templates:
+            if '{teamId}' in template:
+                cache.invalidate(template, teamId=teamId)
+            else:
+                cache.invalidate(template, channelId=channelId)
+
+    # Cache lookups
+
+    def get_team(self, teamId: str) -> Optional[Team]:
+        return self.cache.teams.get(teamId)
+
+    def get_channel(self, channelId: str):
+        return self.cache.channels.get(channelId)
+
+    def get_role(self, roleId: str) -> Optional[Role]:
+        return self.cache.roles.get(roleId)
+
+    def get_member(self, teamId: str, userId: str) -> Optional[Member]:
+        return self.cache.members.get((teamId, userId))
+
+    def get_user(self, userId: str) -> Optional[User]:
+        return self.cache.users.get(userId)
+
+    def get_message(self, messageId: str) -> Optional[Message]:
+        return self.cache.messages.get(messageId)
+
+    def _store_role(self, teamId: str, data: Any) -> Optional[Role]:
+        team = self.get_team(teamId)
+        if team is None:
+            # roles need their team, the next Team.fetch_roles() refetches them
+            self.cache.invalidate_team_roles(teamId)
+            return None
+
+        role = Role(self, team=team, data=data)
+        self.cache.store_role(role)
+        self.cache.invalidate_team_roles(teamId)
+        self.permissions.invalidate(teamId=teamId)
+        return role
+
+
+    def _start_warm_up(self, teamIds: List[str], *, refresh: bool = False) -> None:
+        if self._warmup_task is not None and not self._warmup_task.done():
+            self._warmup_task.cancel()
+        self._warmup_task = asyncio.get_running_loop().create_task(
+            self.warm_up(teamIds, refresh=refresh), name="Teamly.py: cache warm-up"
+        )
 
     def parse_ready(self, data: Any):
+        if self._user is not None:
+            # READY after a reconnect, the session and the user are still
+            # valid but the events missed meanwhile are never replayed, so
+            # nothing cached can be trusted anymore
+            logger.info("Bot reconnected successfuly")
+            teamIds = [teamId for teamId, _ in self.cache.teams.items()]
+            self.cache.clear()
+            self.permissions.invalidate()
+            if self.http.response_cache is not None:
+                self.http.response_cache.clear()
+            self.dispatch("resumed")
+
+            if self.warm_cache and teamIds:
+                self._start_warm_up(teamIds)
+            return
+
         logger.info("Bot connected successfuly")
         self._user: Optional[ClientUser] = data['user']
         self.dispatch("ready")
 
+        if self.cache.enabled and isinstance(data['user'], dict):
+            try:
+                user = User(state=self, data=data['user'])
+            except KeyError as e:
+                # a partial payload only costs the cache entry, fetch_user() builds it later
+                logger.debug("Not caching the client user, READY payload has no {}", e)
+            else:
+                self.cache.users.set(user.id, user)
+
+        if self.warm_cache or self._snapshot_teams:
+            teamIds = list(self.warm_teams)
+            for team in data.get('teams', []):
+                teamId = team['id'] if isinstance(team, dict) else team
+                if teamId not in teamIds:
+                    teamIds.append(teamId)
+            for teamId in self._snapshot_teams:
+                if teamId not in teamIds:
+                    teamIds.append(teamId)
+
+            # after a snapshot was loaded the cache is already warm, it only
+            # has to be reconciled with the server
+            self._start_warm_up(teamIds, refresh=bool(self._snapshot_teams))
+
+    async def fetch_user(self, userId: str, *, refresh: bool = False) -> User:
+        user = self.get_user(userId)
+        if user is not None and not refresh:
+            return user
+
+        data = await self.http.get_user(userId)
+        if user is not None:
+            user._update(data['user'])
+            return user
+
+        user = User(state=self, data=data['user'])
+        self.cache.users.set(user.id, user)
+        return user
+
+    async def fetch_team(self, teamId: str, *, refresh: bool = False) -> Team:
+        team = self.get_team(teamId)
+        if team is not None and not refresh:
+            return team
+
+        data = await self.http.get_team(teamId)
+        if team is not None:
+            team._update(data['team'])
+            return team
+
+        team = Team(state=self, data=data['team'])
+        self.cache.teams.set(team.id, team)
+        return team
+
+    async def load_snapshot(self, path: str, *, max_age: Optional[float] = None) -> None:
+        """Loads a cache snapshot written by :meth:`save_snapshot`.
+
+        Only the raw rows are read here, every entity is built the first
+        time it is looked up. A snapshot older than ``max_age`` seconds is
+        ignored.
+        """
+
+        snapshot = CacheSnapshot(path)
+        rows = await asyncio.get_running_loop().run_in_executor(None, snapshot.load, max_age)
+        if not rows:
+            return
+
+        cache = self.cache
+        loads = self.http.codec.loads
+
+        def loader(kind: str, build: Callable[[Any], Any]) -> Callable[[Any], Any]:
+            raw = rows.get(kind, {})
+
+            def load(key: Any) -> Any:
+                data = raw.pop(key if type(key) is str else ':'.join(key), None)
+                return build(loads(data)) if data is not None else None
+            return load
+
+        def build_channel(data: Any) -> Any:
+            factory = _channel_factory(data['type'])
+            return factory(state=self, data=data) if factory else None
+
+        def build_role(data: Any) -> Optional[Role]:
+            team = self.get_team(data['teamId'])
+            return Role(self, team=team, data=data) if team is not None else None
+
+        cache.teams.loader = loader('teams', lambda data: Team(state=self, data=data))
+        cache.channels.loader = loader('channels', build_channel)
+        cache.roles.loader = loader('roles', build_role)
+
+        for teamId, ids in rows.get('team_channels', {}).items():
+            cache._team_channels.set(teamId, tuple(loads(ids)))
+        for teamId, ids in rows.get('team_roles', {}).items():
+            cache._team_roles.set(teamId, tuple(loads(ids)))
+
+        self._snapshot_teams = list(rows.get('teams', {}))
+        logger.info("Loaded cache snapshot with {} entities", sum(len(r) for r in rows.values()))
+
+    async def save_snapshot(self, path: str) -> None:
+        """Writes the entity cache to ``path``, see :class:`CacheSnapshot`."""
+        rows = CacheSnapshot.dump(self.cache, self.http.codec)
+        await asyncio.get_running_loop().run_in_executor(None, CacheSnapshot(path).save, rows)
+        logger.debug("Saved cache snapshot with {} entities", len(rows))
+
+    async def warm_up(self, teamIds: List[str], *, refresh: bool = False) -> float:
+        """Fills the cache with the team, channels and roles of every team.
+
+        Teams are fetched concurrently. Every request still passes the HTTP
+        rate limiter, so the warm-up never exceeds the request budget. When it
+        is done ``on_cache_ready`` is dispatched with the elapsed seconds.
+
+        Parameters
+        ----------
+        teamIds: List[str]
+            The teams to fetch.
+        refresh: bool
+            Whether to fetch entities that are already cached again, used to
+            reconcile a loaded snapshot with the server.
+
+        Returns
+        -------
+        float
+            How long the warm-up took in seconds.
+        """
+
+        start = time.perf_counter()
+
+        async def warm(teamId: str) -> None:
+            team = await self.fetch_team(teamId, refresh=refresh)
+            await asyncio.gather(team.fetch_channels(refresh=refresh), team.fetch_roles(refresh=refresh))
+
+        results = await asyncio.gather(*(warm(t) for t in teamIds), return_exceptions=True)
+        for teamId, result in zip(teamIds, results):
+            if isinstance(result, BaseException):
+                logger.warning("Cache warm-up failed for team {}: {}", teamId, result)
+
+        self.warmup_duration = time.perf_counter() - start
+        logger.info("Cache warmed up for {} teams in {:.2f} seconds", len(teamIds), self.warmup_duration)
+        self.dispatch("cache_ready", self.warmup_duration)
+        return self.warmup_duration
+
 
 
 
@@ -78,26 +426,51 @@ class ConnectionState:
         factory = _channel_factory(data['channel']['type'])
         if factory:
             channel = factory(state=self, data=data['channel'])
+            self.cache.store_channel(channel)
+            self.cache.invalidate_team_channels(channel.team_id)
             self.dispatch('channel', channel)
 
     def parse_channel_updated(self, data: Any):
+        self.permissions.invalidate(channelId=data['channel']['id'])
+        channel = self.get_channel(data['channel']['id'])
+        if channel is not None and channel.type == data['channel']['type']:
+            before = copy.copy(channel)
+            channel._update(data['channel'])
+            self.dispatch('channel_updated', before, channel)
+            return
+
         factory = _channel_factory(data['channel']['type'])
         if factory:
             channel = factory(state=self, data=data['channel'])
-            self.dispatch('channel_updated', channel)
+            self.cache.store_channel(channel)
+            self.dispatch('channel_updated', None, channel)
 
     def parse_channel_deleted(self, data: Any):
+            self.permissions.invalidate(channelId=data['channelId'])
+            self.cache.remove_channel(data['channelId'], data.get('teamId'))
             self.dispatch('channel_deleted', data)
 
 
 
     def parse_message_send(self, data: Any):
+        if self.cache.messages.max_size > 0 and 'message' in data:
+            self.cache.messages.set(data['message']['id'], Message(state=self, data=data['message']))
         self.dispatch("message", data)
 
     def parse_message_updated(self, data: Any):
-        self.dispatch("message_updated", data)
+        message = self.get_message(data['message']['id'])
+        if message is not None:
+            before = copy.copy(message)
+            message._update(data['message'])
+            self.dispatch("message_updated", before, message)
+            return
+
+        message = Message(state=self, data=data['message'])
+        self.cache.messages.set(message.id, message)
+        self.dispatch("message_updated", None, message)
 
     def parse_message_deleted(self, data: Any):
+        self.cache.messages.pop(data.get('messageId'))
         self.dispatch("message_deleted", data)
 
     def parse_message_reaction_added(self, data: Any):
@@ -114,16 +487,38 @@ class ConnectionState:
 
 
     def parse_team_role_created(self, data: Any):
+        self.permissions.invalidate(teamId=data['teamId'])
+        if 'role' in data:
+            self._store_role(data['teamId'], data['role'])
         self.dispatch("team_role", data)
 
     def parse_team_role_deleted(self, data: Any):
+        self.permissions.invalidate(teamId=data.get('teamId'))
+        self.cache.remove_role(data.get('roleId'), data.get('teamId'))
         self.dispatch("team_role_deleted", data)
 
     def parse_team_roles_updated(self, data: Any):
+        teamId = data.get('teamId')
+        self.permissions.invalidate(teamId=teamId)
+        for payload in data.get('roles', []):
+            role = self.get_role(payload['id'])
+            if role is not None:
+                role._update(payload)
+            else:
+                self._store_role(teamId, payload)
         self.dispatch("team_roles_updated", data)
 
     def parse_team_updated(self, data: Any):
-        self.dispatch("team_updated", data)
+        team = self.get_team(data['team']['id'])
+        if team is not None:
+            before = copy.copy(team)
+            team._update(data['team'])
+            self.dispatch("team_updated", before, team)
+            return
+
+        team = Team(state=self, data=data['team'])
+        self.cache.teams.set(team.id, team)
+        self.dispatch("team_updated", None, team)
 
 
 
@@ -146,6 +541,7 @@ class ConnectionState:
         self.dispatch("user_joined_team", data)
 
     def parse_user_left_team(self, data: Any):
+        self.cache.members.pop((data.get('teamId'), data.get('userId')))
         self.dispatch("user_left_team", data)
 
 
@@ -157,12 +553,24 @@ class ConnectionState:
 
 
     def parse_user_profile_updated(self, data: Any):
+        if 'user' in data:
+            user = self.get_user(data['user']['id'])
+            if user is not None:
+                user._update(data['user'])
+        else:
+            self.cache.users.pop(data.get('userId'))
         self.dispatch("user_profile_updated", data)
 
     def parse_user_role_added(self, data: Any):
+        member = self.get_member(data.get('teamId'), data.get('userId'))
+        if member is not None and data.get('roleId') not in member.roles:
+            member.roles.append(data['roleId'])
         self.dispatch("user_role_added", data)
 
     def parse_user_role_removed(self, data: Any):
+        member = self.get_member(data.get('teamId'), data.get('userId'))
+        if member is not None and data.get('roleId') in member.roles:
+            member.roles.remove(data['roleId'])
         self.dispatch("user_role_removed", data)
 
     def parse_user_updated_voice_metadata(self, data: Any):
@@ -184,9 +592,11 @@ class ConnectionState:
         self.dispatch("categories_priority_updated", data)
 
     def parse_category_updated(self, data: Any):
+        self.permissions.invalidate(teamId=data.get('teamId'))
         self.dispatch("category_updated", data)
 
     def parse_category_deleted(self, data: Any):
+        self.permissions.invalidate(teamId=data.get('teamId'))
         self.dispatch("category_deleted", data)
 
     def parse_category_created(self, data: Any):
@@ -24,16 +24,18 @@ SOFTWARE.
 
 from __future__ import annotations
 
-from ast import Bytes
 import json
 
-from aiohttp.client_reqrep import payload
+from .bulk import BulkResult, run_bulk
+from .channel import _channel_factory
 from .member import Member
+from .role import Role
 
 from .types.team import Team as TeamPayload
-from typing import TYPE_CHECKING, Any, Dict, List, Literal, Optional
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Literal, Optional
 
 if TYPE_CHECKING:
+    from .cache import Channel
     from .state import ConnectionState
 
 
@@ -41,6 +43,9 @@ class Team:
 
     def __init__(self, state: ConnectionState, data: TeamPayload) -> None:
         self._state: ConnectionState = state
+        self._update(data)
+
+    def _update(self, data: TeamPayload) -> None:
         self.id: str = data['id']
         self.name: str = data['name']
         self.profile_picture: Optional[str] = data.get('profilePicture')
@@ -98,9 +103,15 @@ class Team:
     async def remove_role_from_member(self, userId: str, roleId: str):
         await self._state.http.remove_role_from_member(teamId=self.id, userId=userId, roleId=roleId)
 
-    async def get_member(self, userId: str):
-        member = await self._state.http.get_member(teamId=self.id, userId=userId)['member']
-        return Member(state=self._state, data=member)
+    async def get_member(self, userId: str) -> Member:
+        member = self._state.get_member(self.id, userId)
+        if member is not None:
+            return member
+
+        data = await self._state.http.get_member(teamId=self.id, userId=userId)
+        member = Member(state=self._state, data=data['member'])
+        self._state.cache.members.set((self.id, userId), member)
+        return member
 
     async def get_banned_users(self, limit: int = 10):
         return await self._state.http.get_banned_users(teamId=self.id, limit=limit)
@@ -114,11 +125,61 @@ class Team:
     async def kick(self, userId: str):
         await self._state.http.kick_member(teamId=self.id, userId=userId)
 
+    # Bulk moderation, each returns a BulkResult instead of raising
+
+    async def bulk_ban(self, userIds: Iterable[str],/, reason: str = None, *, concurrency: int = 5) -> BulkResult:
+        http = self._state.http
+        return await run_bulk(userIds, lambda userId: http.ban(teamId=self.id, userId=userId, reason=reason), concurrency=concurrency)
+
+    async def bulk_unban(self, userIds: Iterable[str], *, concurrency: int = 5) -> BulkResult:
+        http = self._state.http
+        return await run_bulk(userIds, lambda userId: http.unban(teamId=self.id, userId=userId), concurrency=concurrency)
+
+    async def bulk_kick(self, userIds: Iterable[str], *, concurrency: int = 5) -> BulkResult:
+        http = self._state.http
+        return await run_bulk(userIds, lambda userId: http.kick_member(teamId=self.id, userId=userId), concurrency=concurrency)
+
+    async def bulk_add_role(self, userIds: Iterable[str], roleId: str, *, concurrency: int = 5) -> BulkResult:
+        http = self._state.http
+        return await run_bulk(
+            userIds,
+            lambda userId: http.add_role_to_member(teamId=self.id, userId=userId, roleId=roleId),
+            concurrency=concurrency
+        )
+
+    async def bulk_remove_role(self, userIds: Iterable[str], roleId: str, *, concurrency: int = 5) -> BulkResult:
+        http = self._state.http
+        return await run_bulk(
+            userIds,
+            lambda userId: http.remove_role_from_member(teamId=self.id, userId=userId, roleId=roleId),
+            concurrency=concurrency
+        )
+
     # Channel
 
     async def get_channels(self):
         return await self._state.http.get_channels(teamId=self.id)
 
+    async def fetch_channels(self, *, refresh: bool = False) -> List[Channel]:
+        """Returns the channels of the team as models.
+
+        Served from the cache when possible, ``refresh`` always asks the API.
+        """
+        if not refresh:
+            channels = self._state.cache.get_team_channels(self.id)
+            if channels is not None:
+                return channels
+
+        data = await self._state.http.get_channels(teamId=self.id)
+        channels = []
+        for c in data['channels']:
+            factory = _channel_factory(c['type'])
+            if factory:
+                channels.append(factory(state=self._state, data=c))
+
+        self._state.cache.store_team_channels(self.id, channels)
+        return channels
+
     async def get_channelJ(self, channelId: str):
         return await self._state.http.get_channel_by_Id(teamId=self.id, channelId=channelId)
 
@@ -173,6 +234,22 @@ class Team:
     async def get_roles(self):
         return await self._state.http.get_roles(teamId=self.id)
 
+    async def fetch_roles(self, *, refresh: bool = False) -> List[Role]:
+        """Returns the roles of the team as models.
+
+        Served from the cache when possible, ``refresh`` always asks the API.
+        """
+        if not refresh:
+            roles = self._state.cache.get_team_roles(self.id)
+            if roles is not None:
+                return roles
+
+        data = await self._state.http.get_roles(teamId=self.id)
+        roles = [Role(self._state, team=self, data=r) for r in data['roles']]
+        self._state.cache.store_team_roles(self.id, roles)
+        self._state.permissions.invalidate(teamId=self.id)
+        return roles
+
     async def delete_role(self, roleId: str):
         await self._state.http.delete_role(teamId=self.id, roleId=roleId)
 
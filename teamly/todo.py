@@ -34,6 +34,9 @@ class TodoItem:
 
     def __init__(self,state: ConnectionState ,data: TodoItemPayload) -> None:
         self._state: ConnectionState = state
+        self._update(data)
+
+    def _update(self, data: TodoItemPayload) -> None:
         self.id: str = data['id']
         self.channel_id: str = data['channelId']
         self.type: str = data['type']
@@ -22,12 +22,29 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 '''
 
+from __future__ import annotations
+
 import aiohttp
 import json
+import re
 
 
 from datetime import datetime
-from typing import Union, Dict, Any
+from typing import Callable, Union, Dict, Any, Optional
+
+try:
+    import orjson # type: ignore
+except ImportError:
+    HAS_ORJSON = False
+else:
+    HAS_ORJSON = True
+
+try:
+    import ujson # type: ignore
+except ImportError:
+    HAS_UJSON = False
+else:
+    HAS_UJSON = True
 
 
 class _MissingSentinel:
@@ -48,18 +65,86 @@ class _MissingSentinel:
 
 MISSING: Any = _MissingSentinel()
 
-def _to_json(data: Any):
-    return json.loads(data)
+# matches frames that start with the event type, e.g. b'{"t":"MESSAGE_SEND","d":{...}}'
+_EVENT_TYPE_BYTES = re.compile(rb'\s*\{\s*"t"\s*:\s*"([A-Z_]+)"')
+_EVENT_TYPE_STR = re.compile(r'\s*\{\s*"t"\s*:\s*"([A-Z_]+)"')
+
+class JSONCodec:
+    """Encodes and decodes JSON, always producing ``bytes``.
+
+    Use :meth:`from_name` to pick a backend, ``'orjson'``, ``'ujson'`` or
+    ``'json'`` (the standard library). ``None`` picks the fastest one that is
+    installed.
+
+    Attributes
+    ----------
+    name: str
+        The backend in use.
+    loads: Callable[[Union[bytes, str]], Any]
+        Decodes a document from ``bytes`` or ``str``.
+    dumps: Callable[[Any], bytes]
+        Encodes an object to UTF-8 ``bytes``.
+    """
+
+    __slots__ = ('name', 'loads', 'dumps')
+
+    def __init__(
+        self,
+        name: str,
+        loads: Callable[[Union[bytes, str]], Any],
+        dumps: Callable[[Any], bytes]
+    ) -> None:
+        self.name: str = name
+        self.loads: Callable[[Union[bytes, str]], Any] = loads
+        self.dumps: Callable[[Any], bytes] = dumps
+
+    @classmethod
+    def from_name(cls, name: Optional[str] = None) -> JSONCodec:
+        if name is None:
+            name = 'orjson' if HAS_ORJSON else 'ujson' if HAS_UJSON else 'json'
+
+        if name == 'orjson':
+            if not HAS_ORJSON:
+                raise RuntimeError("orjson is not installed")
+            return cls('orjson', orjson.loads, orjson.dumps)
+
+        if name == 'ujson':
+            if not HAS_UJSON:
+                raise RuntimeError("ujson is not installed")
+            return cls('ujson', ujson.loads, lambda obj: ujson.dumps(obj, ensure_ascii=False).encode('utf-8'))
+
+        if name == 'json':
+            return cls('json', json.loads, lambda obj: json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8'))
+
+        raise ValueError(f"Unknown JSON codec: '{name}'")
+
+    def __repr__(self) -> str:
+        return f"<JSONCodec name={self.name!r}>"
+
+DEFAULT_CODEC: JSONCodec = JSONCodec.from_name()
+
+def _peek_event(data: Union[bytes, str]) -> Optional[str]:
+    """Reads the event type of a gateway frame without decoding it.
+
+    Returns ``None`` when ``"t"`` is not the first key of the frame, the
+    caller has to decode the whole frame then.
+    """
+    if type(data) is bytes:
+        match = _EVENT_TYPE_BYTES.match(data)
+        return match.group(1).decode('ascii') if match else None
+
+    match = _EVENT_TYPE_STR.match(data)
+    return match.group(1) if match else None
 
-async def json_or_text(response: aiohttp.ClientResponse) -> Union[Dict[str, Any], str]:
-    text = await response.text(encoding='utf-8')
+async def json_or_text(response: aiohttp.ClientResponse, codec: Optional[JSONCodec] = None) -> Union[Dict[str, Any], str]:
+    body = await response.read()
     try:
         if 'application/json' in response.headers['content-type']:
-            return json.loads(text)
+            return (codec or DEFAULT_CODEC).loads(body)
     except KeyError:
         pass
 
-    return text
+    return body.decode('utf-8')
 
 
 def _to_datetime(date: datetime):
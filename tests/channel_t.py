@@ -16,11 +16,12 @@ async def on_ready():
 
 @client.event
 async def on_channel(channel):
-    print(json.dumps(channel, indent=4, ensure_ascii=False))
+    print(json.dumps(channel.to_dict(), indent=4, ensure_ascii=False))
 
 @client.event
-async def on_channel_updated(channel):
-    print(json.dumps(channel, indent=4, ensure_ascii=False))
+async def on_channel_updated(before, after):
+    print(before)
+    print(json.dumps(after.to_dict(), indent=4, ensure_ascii=False))
 
 @client.event
 async def on_channel_deleted(data):
@@ -0,0 +1,69 @@
+'''
+Compares the old gateway decode path (bytes -> str -> json.loads on every
+frame) with the current one (peek "t", skip unwanted events, decode
+straight from bytes with the default codec) on frames shaped like the
+ones in event-schemas/.
+
+    python tests/gateway_decode_bench.py
+'''
+
+import json
+import random
+import timeit
+
+from teamly import utils
+
+user = {
+    "id": "1234567890", "username": "bench", "subdomain": "bench",
+    "profilePicture": None, "banner": None, "bot": False, "system": False,
+    "webhook": False, "presence": 1, "badges": [], "createdAt": "2025-01-01T00:00:00Z",
+    "lastOnline": None, "flags": 0, "userStatus": {"content": None, "emojiId": None},
+    "userRPC": {}
+}
+
+channel = {
+    "id": "c1", "type": "text", "teamId": "t1", "name": "general", "description": None,
+    "createdBy": user, "createdAt": "2025-01-01T00:00:00Z", "parentId": None,
+    "priority": 0, "permissions": {}, "rateLimitPerUser": 0, "additionalData": {}
+}
+
+message = {
+    "id": "m1", "channelId": "c1", "type": "text", "content": "hello " * 40,
+    "attachments": [], "createdBy": user, "editedAt": None, "replyTo": None,
+    "embeds": [], "emojis": [], "reactions": [], "nonce": None,
+    "createdAt": "2025-01-01T00:00:00Z", "mentions": {"users": []}
+}
+
+FRAMES = [
+    json.dumps({"t": "MESSAGE_SEND", "d": {"message": message, "teamId": "t1"}}).encode(),
+    json.dumps({"t": "PRESENCE_UPDATE", "d": {"userId": "1234567890", "presence": 2}}).encode(),
+    json.dumps({"t": "CHANNEL_UPDATED", "d": {"channel": channel, "teamId": "t1"}}).encode(),
+    json.dumps({"t": "HEARTBEAT_ACK", "d": {}}).encode(),
+]
+
+# a bot that only listens to on_channel_updated
+SUBSCRIBED = frozenset({"READY", "CHANNEL_UPDATED"})
+
+random.seed(0)
+RECORDING = [random.choice(FRAMES) for _ in range(10_000)]
+
+
+def old_path():
+    for frame in RECORDING:
+        msg = json.loads(frame.decode('utf-8'))
+        if msg["t"] in SUBSCRIBED:
+            msg["d"]
+
+def new_path():
+    for frame in RECORDING:
+        event = utils._peek_event(frame)
+        if event is not None and event not in SUBSCRIBED:
+            continue
+        msg = utils.DEFAULT_CODEC.loads(frame)
+        msg["d"]
+
+
+if __name__ == '__main__':
+    for name, func in (("old", old_path), ("new", new_path)):
+        best = min(timeit.repeat(func, number=1, repeat=5))
+        print(f"{name}: {best * 1000:.1f} ms for {len(RECORDING)} frames ({len(RECORDING) / best:,.0f} frames/s)")
@@ -0,0 +1,93 @@
+'''
+Checks PermissionResolver against role overwrites without a connection.
+
+    python tests/permissions_t.py
+'''
+
+import asyncio
+
+from types import SimpleNamespace
+
+from teamly.http import HTTPClient
+from teamly.member import Member
+from teamly.permissions import PermissionsOverwrite
+from teamly.state import ConnectionState
+
+SEND = PermissionsOverwrite.FLAGS['text']['send_messages']
+
+
+def role(id, priority, permissions=0):
+    return {"id": id, "name": id, "color": "#ffffff", "permissions": permissions,
+            "priority": priority, "createdAt": "2025-01-01T00:00:00Z"}
+
+
+def new_state(loop, **kwargs):
+    state = ConnectionState(lambda *args: None, HTTPClient(loop), **kwargs)
+    state.cache.teams.set("t1", SimpleNamespace(id="t1", created_by="owner"))
+    return state
+
+
+async def main():
+    loop = asyncio.get_running_loop()
+    member_data = {"id": "u1", "username": "u1", "permissions": "0",
+                   "roles": ["member", "muted"], "joinedAt": "2025-01-01T00:00:00Z"}
+    # the higher "muted" role denies send_messages, "member" allows it
+    channel = SimpleNamespace(id="c1", team_id="t1", type="text", permissions={"role": {
+        "member": {"allow": SEND, "deny": 0},
+        "muted": {"allow": 0, "deny": SEND},
+    }})
+
+    state = new_state(loop)
+    member = Member(state=state, data=member_data)
+
+    # the deny overwrite belongs to a role that isn't cached yet
+    state._store_role("t1", role("member", 1))
+    try:
+        member.permissions_in(channel)
+    except LookupError as e:
+        print("unresolved:", e)
+    else:
+        raise AssertionError("resolved with a role missing")
+    assert len(state.permissions) == 0, "a partial result was memoized"
+
+    state._store_role("t1", role("muted", 5))
+    resolved = member.permissions_in(channel)
+    assert not resolved.has('send_messages'), resolved
+    assert resolved.has('view_channel'), resolved
+    assert member.permissions_in(channel) is resolved
+    print("denied:", resolved)
+
+    # storing roles drops the memoized results of the team
+    state._store_role("t1", role("muted", 0))
+    resolved = member.permissions_in(channel)
+    assert resolved.has('send_messages'), resolved
+    print("allowed after the priorities changed:", resolved)
+
+    # a category deny applies to the channels in it, the category has to be passed
+    category = SimpleNamespace(id="cat1", permissions={"role": {"member": {"allow": 0, "deny": SEND}}})
+    categorized = SimpleNamespace(id="c2", team_id="t1", type="text", parent_id="cat1", permissions={})
+    try:
+        member.permissions_in(categorized)
+    except LookupError as e:
+        print("unresolved:", e)
+    else:
+        raise AssertionError("resolved without the category")
+    resolved = member.permissions_in(categorized, category=category)
+    assert not resolved.has('send_messages'), resolved
+    print("denied by the category:", resolved)
+
+    # without an entity cache no role is ever known, nothing is allowed by default
+    state = new_state(loop, cache_size=0)
+    state._store_role("t1", role("member", 1))
+    state._store_role("t1", role("muted", 5))
+    try:
+        Member(state=state, data=member_data).permissions_in(channel)
+    except LookupError:
+        print("unresolved without a cache")
+    else:
+        raise AssertionError("resolved without a cache")
+
+    print("ok")
+
+
+asyncio.run(main())